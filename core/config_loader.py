@@ -1,3 +1,5 @@
+import json
+import os
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -30,7 +32,53 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     raise FileNotFoundError("No configuration file found. Please create `config.yaml` or copy `config.example.yaml`.")
 
 
+def _cache_path(path: Path) -> Path:
+    return path.with_name(path.name + '.cache.json')
+
+
+def _load_cached(path: Path, sig: list) -> Optional[Dict[str, Any]]:
+    try:
+        with _cache_path(path).open('r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if isinstance(cached, dict) and cached.get('_sig') == sig and isinstance(cached.get('data'), dict):
+        return cached['data']
+    return None
+
+
+def _store_cached(path: Path, sig: list, data: Dict[str, Any]) -> None:
+    # Only cache configs that survive a JSON round trip unchanged (e.g. no YAML dates or int keys)
+    try:
+        payload = json.dumps({'_sig': sig, 'data': data}, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return
+    if json.loads(payload)['data'] != data:
+        return
+    cache = _cache_path(path)
+    tmp = cache.with_name(cache.name + f'.{os.getpid()}.tmp')
+    try:
+        tmp.write_text(payload, encoding='utf-8')
+        os.replace(tmp, cache)
+    except OSError:
+        # Cache is best-effort (e.g. read-only mounts); fall back to parsing every time
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
 def _parse_yaml(path: Path) -> Dict[str, Any]:
+    """
+    Parse a YAML config, reusing a JSON snapshot (`<file>.cache.json`) when the source file's
+    mtime and size are unchanged since it was written.
+    """
+    st = path.stat()
+    sig = [st.st_mtime_ns, st.st_size]
+    cached = _load_cached(path, sig)
+    if cached is not None:
+        return cached
+
     try:
         import yaml  # type: ignore
     except Exception as e:
@@ -38,8 +86,12 @@ def _parse_yaml(path: Path) -> Dict[str, Any]:
             "PyYAML is required to parse configuration files. Please install `pyyaml` or add it to requirements.txt"
         ) from e
 
+    # libyaml-backed loader when available (bundled with the PyPI wheels); same safe semantics
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
     text = _read_text(path)
-    data = yaml.safe_load(text) or {}
+    data = yaml.load(text, Loader=loader) or {}
     if not isinstance(data, dict):
         raise ValueError(f"Top-level YAML must be a mapping (dict). File: {path}")
+    _store_cached(path, sig, data)
     return data
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import pickle
 from dataclasses import dataclass
-from typing import Callable, Dict, Iterable, List, Tuple
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, Tuple
 
 # Types
 Doc = dict
@@ -15,17 +20,62 @@ class DatasetPlugin:
     prepare_tasks: Callable[[Doc], Iterable[Task]]  # generator over a single doc -> tasks
 
 
+# ---- Preprocessed snapshot cache ---------------------------------------------
+
+# Bump when preprocessing output changes for the same input files, to invalidate old snapshots
+_PREPROCESS_CACHE_VERSION = 1
+
+
+def _cached_preprocess(cfg: Dict, plugin_name: str, input_paths: List[str], build: Callable[[], List[Doc]]) -> List[Doc]:
+    """
+    Return `build()`, reusing a pickled snapshot from `paths.preprocess_cache_dir` when the input
+    files are unchanged (same paths, mtimes and sizes). Disabled when the setting is absent.
+    """
+    cache_dir = cfg.get('paths', {}).get('preprocess_cache_dir')
+    if not cache_dir:
+        return build()
+
+    h = hashlib.sha1(f"{plugin_name}\0{_PREPROCESS_CACHE_VERSION}".encode('utf-8'))
+    for p in input_paths:
+        st = Path(p).stat()
+        h.update(f"\0{Path(p).resolve()}\0{st.st_mtime_ns}\0{st.st_size}".encode('utf-8'))
+    snapshot = Path(cache_dir) / plugin_name / f"{h.hexdigest()}.pkl"
+
+    try:
+        with snapshot.open('rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    docs = build()
+    tmp = snapshot.with_name(f"{snapshot.name}.{os.getpid()}.tmp")
+    try:
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open('wb') as f:
+            pickle.dump(docs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snapshot)
+    except OSError:
+        # Snapshot is best-effort (e.g. read-only mounts, full disk); the docs are already built
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+    return docs
+
+
 # ---- BASSE plugin wrappers ---------------------------------------------------
 
 def _basse_preprocess(cfg: Dict) -> List[Doc]:
-    from pathlib import Path
     from preprocessing.basse_preprocessing import process_basse_extractions
 
     path = cfg.get('paths', {}).get('basse_jsonl')
     if not path:
         raise ValueError("Missing 'paths.basse_jsonl' in config for BASSE dataset")
     p = Path(path)
-    return process_basse_extractions(str(p))
+    if not p.exists():
+        # Let the preprocessing step raise its descriptive FileNotFoundError
+        return process_basse_extractions(str(p))
+    return _cached_preprocess(cfg, 'BASSE', [str(p)], lambda: process_basse_extractions(str(p)))
 
 
 def _basse_prepare_tasks(doc: Doc):
@@ -37,16 +87,15 @@ def _basse_prepare_tasks(doc: Doc):
 # ---- FLARES plugin wrappers --------------------------------------------------
 
 def _flares_preprocess(cfg: Dict) -> List[Doc]:
-    from preprocessing.flares_preprocessing import load_and_merge_datasets, process_and_flatten_data
+    from preprocessing.flares_preprocessing import load_flares_dataset
 
     train = cfg.get('paths', {}).get('flares_train')
     trial = cfg.get('paths', {}).get('flares_trial')
     paths = [p for p in [train, trial] if p]
     if not paths:
         raise ValueError("Missing FLARES file paths in config ('paths.flares_train' and/or 'paths.flares_trial')")
-    merged = load_and_merge_datasets(paths)
-    flat = process_and_flatten_data(merged)
-    return flat
+    verbose = bool(cfg.get('run', {}).get('verbose', True))
+    return _cached_preprocess(cfg, 'FLARES', paths, lambda: load_flares_dataset(paths, verbose=verbose))
 
 
 def _flares_prepare_tasks(doc: Doc):
@@ -57,14 +106,24 @@ def _flares_prepare_tasks(doc: Doc):
 
 # ---- Registry ----------------------------------------------------------------
 
-_REGISTRY: Dict[str, DatasetPlugin] = {
+_REGISTRY: Mapping[str, DatasetPlugin] = MappingProxyType({
     'BASSE': DatasetPlugin('BASSE', _basse_preprocess, _basse_prepare_tasks),
     'FLARES': DatasetPlugin('FLARES', _flares_preprocess, _flares_prepare_tasks),
-}
+})
+
+# Common spellings precomputed so a lookup is a single dict hit
+_ALIASES: Mapping[str, DatasetPlugin] = MappingProxyType({
+    alias: plugin
+    for key, plugin in _REGISTRY.items()
+    for alias in (key, key.lower(), key.title())
+})
 
 
 def get_plugin(dataset_name: str) -> DatasetPlugin:
-    key = (dataset_name or '').strip().upper()
-    if key not in _REGISTRY:
+    plugin = _ALIASES.get(dataset_name)
+    if plugin is None:
+        # Anything else (surrounding spaces, odd casing) goes through full normalization
+        plugin = _REGISTRY.get((dataset_name or '').strip().upper())
+    if plugin is None:
         raise KeyError(f"Unknown dataset '{dataset_name}'. Available: {', '.join(_REGISTRY.keys())}")
-    return _REGISTRY[key]
+    return plugin
@@ -1,38 +1,162 @@
 from __future__ import annotations
 
-import json
-from datetime import datetime
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from string import Formatter
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from tqdm import tqdm  # type: ignore[import-untyped]
 
 
 def timestamp() -> str:
-    return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return time.strftime("%Y-%m-%d_%H-%M-%S")
 
 
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def read_text_file(path: Path) -> str:
-    with path.open('r', encoding='utf-8') as f:
+@lru_cache(maxsize=64)
+def _cached_read(path_str: str, mtime_ns: int) -> str:
+    with open(path_str, 'r', encoding='utf-8') as f:
         return f.read()
 
 
+def read_text_file(path: Path) -> str:
+    # Prompt files are re-read by every evaluator; the mtime in the key invalidates edited files
+    resolved = path.resolve()
+    return _cached_read(str(resolved), resolved.stat().st_mtime_ns)
+
+
+def compile_template(template: str) -> Callable[..., str]:
+    """
+    Parse a `str.format`-style template once and return a function that renders it by plain
+    concatenation. Only bare `{name}` fields are supported (no conversions or format specs).
+    """
+    parts: List[Tuple[str, Optional[str]]] = []
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if field is not None and (not field or spec or conversion):
+            raise ValueError(f"Unsupported template field '{{{field}}}': only named fields without format specs are allowed")
+        parts.append((literal, field))
+
+    def render(**values: Any) -> str:
+        out: List[str] = []
+        for literal, field in parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(values[field]))
+        return ''.join(out)
+
+    return render
+
+
+def progress(desc: str, total: Optional[int] = None, enabled: bool = True) -> tqdm:
+    """tqdm progress bar counting tasks; hidden when `enabled` is false."""
+    return tqdm(total=total, desc=desc, unit='task', disable=not enabled)
+
+
 def write_json(path: Path, data: Dict[str, Any]) -> None:
-    with path.open('w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # Values JSON can't represent natively (e.g. Paths, numpy scalars) are written as strings
+    path.write_bytes(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+
+def dumps_indented(obj: Any) -> str:
+    """Pretty-printed JSON text (2-space indent, non-ASCII kept), e.g. for review fields and debug output."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+def append_jsonl(f: IO[str], record: Dict[str, Any]) -> None:
+    # One record per line, flushed right away so a crash loses at most the line being written
+    f.write(orjson.dumps(record, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8') + '\n')
+    f.flush()
+
+
+# Lines buffered before each writelines call when writing a whole JSONL file
+_JSONL_WRITE_CHUNK = 1024
+
+
+def write_jsonl(path: Path, records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Write `records` (any iterable, e.g. a generator) to `path` as JSONL, one record per line, in
+    chunks of `_JSONL_WRITE_CHUNK` lines. Returns the number of records written.
+    """
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+    n = 0
+    buf: List[bytes] = []
+    with path.open('wb') as f:
+        for record in records:
+            buf.append(orjson.dumps(record, default=str, option=option))
+            if len(buf) >= _JSONL_WRITE_CHUNK:
+                f.writelines(buf)
+                n += len(buf)
+                buf.clear()
+        f.writelines(buf)
+        n += len(buf)
+    return n
+
+
+def split_batches(items: List[bytes], max_items: int, max_bytes: int, item_overhead: int = 0) -> List[List[bytes]]:
+    """
+    Split serialized batch requests, in order, into groups of at most `max_items` whose sizes
+    (each plus `item_overhead` bytes, e.g. a separator) add up to at most `max_bytes`. A single
+    item above `max_bytes` still gets a group of its own, so the provider reports it as an error.
+    """
+    groups: List[List[bytes]] = []
+    group: List[bytes] = []
+    size = 0
+    for item in items:
+        n = len(item) + item_overhead
+        if group and (len(group) >= max_items or size + n > max_bytes):
+            groups.append(group)
+            group, size = [], 0
+        group.append(item)
+        size += n
+    if group:
+        groups.append(group)
+    return groups
+
+
+def read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    """Read a JSONL file, skipping blank lines and a truncated last line left by an interrupted run."""
+    records: List[Dict[str, Any]] = []
+    if not path.exists():
+        return records
+    with path.open('rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(orjson.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+# Characters that are unsafe or awkward in file names, mapped in a single pass
+_SANITIZE = str.maketrans({'/': '_', ':': '_', ' ': '_'})
 
 
 def result_filename(env: str, dataset: str, provider: str, model: str, results_dir: Path) -> Path:
     # Normalize names similar to existing outputs
     dataset_up = dataset.upper()
-    provider_norm = provider.replace('/', '_').replace(':', '_')
-    model_norm = model.replace('/', '_').replace(':', '_').replace(' ', '_')
+    provider_norm = provider.translate(_SANITIZE)
+    model_norm = model.translate(_SANITIZE)
     ts = timestamp()
     name = f"{ts}_{env}_{dataset_up}_{provider_norm}_{model_norm}.json"
     return results_dir / name
 
 
+def checkpoint_filename(env: str, dataset: str, provider: str, model: str, results_dir: Path) -> Path:
+    # No timestamp: a re-run of the same (env, dataset, provider, model) must find the previous checkpoint
+    name = f"{env}_{dataset.upper()}_{provider.translate(_SANITIZE)}_{model.translate(_SANITIZE)}.partial.jsonl"
+    return results_dir / name
+
+
+def preprocessed_filename(env: str, dataset: str, results_dir: Path) -> Path:
+    return results_dir / f"{timestamp()}_{env}_{dataset.upper()}_preprocessed.jsonl"
+
+
 def review_filename(base_json: Path) -> Path:
     return base_json.with_name(base_json.stem + "_review.json")
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, Protocol, Iterable, List, Tuple
+from typing import Callable, Dict, Protocol, Iterable, List, Optional, Tuple
 
 
 Task = Tuple[str, str, str, str]
@@ -10,9 +10,36 @@ class Evaluator(Protocol):
     def evaluate(self, tasks: Iterable[Task]) -> List[Dict]:
         ...
 
+    async def evaluate_async(
+        self,
+        tasks: Iterable[Task],
+        max_inflight: Optional[int] = None,
+        on_result: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Dict]:
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
 
 def get_evaluator(cfg: Dict) -> Evaluator:
-    provider = (cfg.get('llm', {}) or {}).get('provider', 'openai').strip().lower()
+    llm = cfg.get('llm', {}) or {}
+    provider = llm.get('provider', 'openai').strip().lower()
+    mode = str((cfg.get('run', {}) or {}).get('mode', 'sync')).strip().lower()
+    # `llm.batch_mode: true` is shorthand for `run.mode: batch`
+    if llm.get('batch_mode'):
+        mode = 'batch'
+    if mode == 'batch':
+        if provider == 'openai':
+            from .openai_batch_runner import OpenAIBatchEvaluator
+            return OpenAIBatchEvaluator(cfg)
+        elif provider in ('anthropic', 'claude'):
+            from .anthropic_batch_runner import AnthropicBatchEvaluator
+            return AnthropicBatchEvaluator(cfg)
+        raise ValueError(f"run.mode 'batch' is only supported for providers 'openai' and 'anthropic' (got '{provider}')")
+    elif mode != 'sync':
+        raise ValueError(f"Unknown run.mode '{mode}'. Supported: sync | batch")
+
     if provider == 'openai':
         from .openai_runner import OpenAIEvaluator
         return OpenAIEvaluator(cfg)
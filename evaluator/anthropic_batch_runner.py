@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.utils import split_batches
+from pydantic_models.output_struct_models import validate_evaluation
+
+from .anthropic_runner import _SCHEMA, AnthropicEvaluator
+from .response_cache import ResponseCache, cached_result
+
+
+Task = Tuple[str, str, str, str]
+
+# Anthropic's OpenAI-compatible endpoint has no batch support, so batches use the native API
+_API_BASE = "https://api.anthropic.com/v1/"
+_API_VERSION = "2023-06-01"
+# Native (Messages API) form of the save_evaluation tool
+_NATIVE_TOOLS = [
+    {
+        "name": "save_evaluation",
+        "description": "Saves the structured evaluation result of an extraction.",
+        "input_schema": _SCHEMA,
+    }
+]
+_NATIVE_TOOL_CHOICE = {"type": "tool", "name": "save_evaluation"}
+# Closes the user message, messages list, params and request opened by the prebuilt prefix
+_REQUEST_SUFFIX = '}]}}'
+# Message Batches limits per batch; larger runs are split across several batches
+_MAX_BATCH_REQUESTS = 100_000
+_MAX_BATCH_BYTES = 256_000_000
+# Bytes of the '{"requests": [' ... ']}' envelope and of the ', ' between requests
+_BODY_OVERHEAD = len('{"requests": []}')
+_SEPARATOR_BYTES = len(', ')
+
+
+class AnthropicBatchEvaluator(AnthropicEvaluator):
+    """
+    Anthropic runner that submits all tasks through the Message Batches API instead of one
+    request per task. Like the OpenAI batch runner, batches are billed at half price and
+    complete asynchronously (within 24h). Enabled with `run.mode: batch` (or `llm.batch_mode: true`).
+    """
+    def __init__(self, cfg: Dict):
+        super().__init__(cfg)
+        run_cfg = cfg.get('run', {})
+        self.poll_interval: float = float(run_cfg.get('batch_poll_seconds', 30))
+        # Runs smaller than this skip the batch queue and use regular concurrent requests
+        self.batch_min_size: int = max(1, int(run_cfg.get('batch_min_size', 1)))
+        # Model, system prompt and tool schema are the same for every request: serialize them
+        # once and splice only the user message in per task
+        params_head = json.dumps({
+            "model": self.model_cfg.model,
+            "max_tokens": self.model_cfg.max_output_tokens,
+            "system": self.system_prompt,
+            "tools": _NATIVE_TOOLS,
+            "tool_choice": _NATIVE_TOOL_CHOICE,
+        }, ensure_ascii=False)[:-1]
+        self._request_prefix = f', "params": {params_head}, "messages": [{{"role": "user", "content": '
+
+    def _batch_request(self, i: int, user_prompt: str) -> str:
+        """JSON of one entry of the batch's `requests` list for task `i`."""
+        user_content = json.dumps(user_prompt, ensure_ascii=False)
+        # custom_id only allows [a-zA-Z0-9_-]{1,64}; the index maps results back to their task
+        return f'{{"custom_id": "task-{i}"{self._request_prefix}{user_content}{_REQUEST_SUFFIX}'
+
+    def _result_from_line(self, task: Task, line: Optional[Dict]) -> Dict:
+        doc_id, _, _, model_name = task
+        result = {
+            "document_idx": doc_id,
+            "model_evaluated": model_name,
+            "evaluation_data": None,
+            "token_usage": {},
+        }
+        if line is None:
+            result["error"] = "Batch API returned no output for this task"
+            return result
+
+        outcome = line.get("result") or {}
+        if outcome.get("type") != "succeeded":
+            result["error"] = f"Batch request {outcome.get('type')}: {outcome.get('error')}"
+            return result
+
+        message = outcome.get("message") or {}
+        usage = message.get("usage")
+        if usage:
+            prompt_tokens = usage.get('input_tokens')
+            completion_tokens = usage.get('output_tokens')
+            result["token_usage"] = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": (prompt_tokens or 0) + (completion_tokens or 0),
+            }
+
+        raw_content = None
+        try:
+            blocks = message.get("content") or []
+            tool_inputs = [b.get("input") for b in blocks if b.get("type") == "tool_use"]
+            if tool_inputs:
+                raw_content = json.dumps(tool_inputs[0], ensure_ascii=False)  # input is already a dict
+                evaluation_data = validate_evaluation(tool_inputs[0])
+            else:
+                raw_content = "".join(b.get("text", "") for b in blocks if b.get("type") == "text") or "{}"
+                evaluation_data = validate_evaluation(json.loads(raw_content))
+        except Exception as e:
+            if self.verbose:
+                print(f"[!] Parsing error for doc_id={doc_id} | model={model_name}: {e}")
+            result["error"] = f"Pydantic parsing error: {e}"
+            result["raw_output"] = raw_content
+            return result
+
+        result["evaluation_data"] = evaluation_data
+        return result
+
+    async def _run_batch(self, requests: List[bytes]) -> Dict[int, Dict]:
+        """Submit one batch of encoded requests, wait for it and return result lines by task index."""
+        import httpx
+
+        headers = {
+            "x-api-key": self._client_kwargs["api_key"],
+            "anthropic-version": _API_VERSION,
+        }
+        async with httpx.AsyncClient(base_url=_API_BASE, headers=headers, timeout=httpx.Timeout(600.0, connect=10.0)) as http:
+            resp = await http.post(
+                "messages/batches",
+                content=b'{"requests": [' + b", ".join(requests) + b']}',
+                headers={"content-type": "application/json"},
+            )
+            resp.raise_for_status()
+            batch = resp.json()
+            if self.verbose:
+                print(f"Submitted batch {batch['id']} ({len(requests)} requests). Polling every {self.poll_interval:g}s…")
+
+            while batch.get("processing_status") != "ended":
+                await asyncio.sleep(self.poll_interval)
+                resp = await http.get(f"messages/batches/{batch['id']}")
+                resp.raise_for_status()
+                batch = resp.json()
+                if self.verbose:
+                    counts = batch.get("request_counts") or {}
+                    print(f"    Batch {batch['id']}: status={batch.get('processing_status')} | succeeded={counts.get('succeeded', '?')}/{len(requests)}")
+
+            by_index: Dict[int, Dict] = {}
+            if batch.get("results_url"):
+                resp = await http.get(batch["results_url"])
+                resp.raise_for_status()
+                for raw in resp.text.splitlines():
+                    if raw.strip():
+                        line = json.loads(raw)
+                        by_index[int(str(line.get("custom_id", "task-0")).rsplit("-", 1)[-1])] = line
+        return by_index
+
+    async def evaluate_async(
+        self,
+        tasks: Iterable[Task],
+        max_inflight: Optional[int] = None,
+        on_result: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Dict]:
+        """
+        Upload all tasks (except response-cache hits) as Message Batches, split to stay within
+        the per-batch limits, poll until they end and map the results back to the input order. Tasks missing from the results are reported
+        as error results. `max_inflight` only applies when the run is below `run.batch_min_size`
+        and falls back to regular requests. `on_result` is called for cache hits right away and
+        for the other tasks once the batches have ended.
+        """
+        tasks = list(tasks)
+        if len(tasks) < self.batch_min_size:
+            if self.verbose:
+                print(f"{len(tasks)} tasks < run.batch_min_size={self.batch_min_size}; sending them as regular requests.")
+            return await super().evaluate_async(tasks, max_inflight=max_inflight, on_result=on_result)
+        if self.verbose:
+            print("=== EVALUATION START (Anthropic Message Batches API) ===")
+            print(f"Model: {self.model_cfg.model} | Max output tokens: {self.model_cfg.max_output_tokens} | Tasks: {len(tasks)}")
+        if not tasks:
+            return []
+
+        results: List[Optional[Dict]] = [None] * len(tasks)
+        # (task index, task, rendered user prompt, response-cache key)
+        pending: List[Tuple[int, Task, str, Optional[str]]] = []
+        for i, (doc_id, original_text, extraction, model_name) in enumerate(tasks, start=1):
+            user_prompt = self.build_user_prompt(original_text, extraction)
+            cache_key = None
+            if self.cache is not None:
+                cache_key = ResponseCache.key("anthropic", self.model_cfg.model, self.system_prompt, user_prompt)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    results[i - 1] = cached_result(doc_id, model_name, cached)
+                    if on_result is not None:
+                        on_result(results[i - 1])
+                    continue
+            too_long = self.budget.exceeded(user_prompt)
+            if too_long:
+                results[i - 1] = {
+                    "document_idx": doc_id,
+                    "model_evaluated": model_name,
+                    "evaluation_data": None,
+                    "token_usage": {},
+                    "error": too_long,
+                }
+                continue
+            pending.append((i, tasks[i - 1], user_prompt, cache_key))
+
+        if pending:
+            requests = [self._batch_request(i, prompt).encode('utf-8') for i, _, prompt, _ in pending]
+            groups = split_batches(requests, _MAX_BATCH_REQUESTS, _MAX_BATCH_BYTES - _BODY_OVERHEAD, _SEPARATOR_BYTES)
+            # custom_ids carry the task index, so the per-batch maps merge without collisions
+            by_index: Dict[int, Dict] = {}
+            for batch_results in await asyncio.gather(*(self._run_batch(group) for group in groups)):
+                by_index.update(batch_results)
+            for i, task, _, cache_key in pending:
+                result = self._result_from_line(task, by_index.get(i))
+                if self.cache is not None and result["evaluation_data"] is not None:
+                    self.cache.put(cache_key, {"evaluation_data": result["evaluation_data"], "token_usage": result["token_usage"]})
+                results[i - 1] = result
+                if on_result is not None:
+                    on_result(result)
+
+        if self.verbose:
+            total = sum(((r.get("token_usage", {}) or {}).get("total_tokens") or 0) for r in results)
+            print(f"=== EVALUATION END — items: {len(results)}, total_tokens: {total} ===")
+            if self.cache is not None:
+                print(f"Response {self.cache.summary()}")
+        return results
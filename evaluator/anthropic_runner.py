@@ -1,12 +1,34 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from openai import OpenAI
-from pydantic_models.output_pydantic_models import DetailedEvaluation
+from openai import APIError, AsyncOpenAI
+
+from pydantic_models.output_pydantic_models import DETAILED_EVALUATION_ADAPTER
+from pydantic_models.output_struct_models import decode_evaluation, validate_evaluation
+
+from .http_client import build_async_http_client
+from .response_cache import ResponseCache, cached_result
+from .token_budget import TokenBudget
+
+
+# Tool definition is identical for every request: build the JSON schema once at import time
+_SCHEMA = DETAILED_EVALUATION_ADAPTER.json_schema()
+_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "save_evaluation",
+            "description": "Saves the structured evaluation result of an extraction.",
+            "parameters": _SCHEMA,
+        },
+    }
+]
+_TOOL_CHOICE = {"type": "function", "function": {"name": "save_evaluation"}}
 
 
 Task = Tuple[str, str, str, str]
@@ -35,13 +57,30 @@ class AnthropicEvaluator:
         )
 
         prompts = cfg.get('prompts', {})
-        from core.utils import read_text_file
+        from core.utils import compile_template, read_text_file
         from pathlib import Path
         self.system_prompt = read_text_file(Path(prompts.get('system_prompt_path', 'prompts/system_evaluation_prompt.txt')))
         self.user_prompt_template = read_text_file(Path(prompts.get('user_prompt_path', 'prompts/user_evaluation_prompt.txt')))
+        # Parse the template once; rendering per task is then plain string concatenation.
+        self._render_user_prompt = compile_template(self.user_prompt_template)
+        # Only the user message changes per task; reuse the system message dict
+        self._system_message = {"role": "system", "content": self.system_prompt}
+        # Local token count to skip requests that cannot fit the model's context window
+        self.budget = TokenBudget(
+            self.model_cfg.model,
+            self.model_cfg.max_output_tokens,
+            self.system_prompt + json.dumps(_SCHEMA),
+            context_window=int(llm['context_window']) if llm.get('context_window') else None,
+        )
 
         run_cfg = cfg.get('run', {})
         self.verbose: bool = bool(run_cfg.get('verbose', True))
+        # Number of requests in flight at once; all of them share one event loop and connection pool
+        self.concurrency: int = max(1, int(run_cfg.get('concurrency', 8)))
+        # Optional disk cache of results keyed by (provider, model, system prompt, user prompt);
+        # `run.cache_enabled: false` turns it off without dropping the directory setting
+        cache_dir = run_cfg.get('cache_dir') if run_cfg.get('cache_enabled', True) else None
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
 
         # Build OpenAI-compatible client targeting Anthropic endpoint
         api_key = os.getenv("ANTHROPIC_API_KEY") or llm.get('api_key')
@@ -51,115 +90,192 @@ class AnthropicEvaluator:
                 "ANTHROPIC_API_KEY is not set. Set it as an environment variable, put it in a .env file, "
                 "or provide llm.api_key in config.yaml."
             )
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self._client_kwargs = {"api_key": api_key, "base_url": base_url}
+        self.client = self._build_client()
         if self.verbose:
             print(f"OpenAI client (Anthropic via base_url) initialized. Model: {self.model_cfg.model}. Max tokens: {self.model_cfg.max_output_tokens}")
 
+    def _build_client(self):
+        # One keep-alive pool for the whole run instead of a TLS handshake per request
+        http_client = build_async_http_client(max_connections=max(256, self.concurrency))
+        return AsyncOpenAI(**self._client_kwargs, http_client=http_client)
+
+    async def aclose(self) -> None:
+        """Close the client and its connection pool."""
+        await self.client.close()
+
     def build_user_prompt(self, original_document: str, extraction_to_evaluate: str) -> str:
-        return self.user_prompt_template.format(
+        return self._render_user_prompt(
             original_document=original_document,
             extraction_to_evaluate=extraction_to_evaluate,
         )
 
-    def evaluate(self, tasks: Iterable[Task]) -> List[Dict]:
-        results: List[Dict] = []
-        if self.verbose:
-            print("=== EVALUATION START (Anthropic via OpenAI client) ===")
-            print(f"Model: {self.model_cfg.model} | Max output tokens: {self.model_cfg.max_output_tokens}")
+    async def _run_one(self, i: int, task: Task) -> Dict:
+        doc_id, original_text, extraction, model_name = task
+        user_prompt = self.build_user_prompt(original_text, extraction)
 
-        for i, (doc_id, original_text, extraction, model_name) in enumerate(tasks, start=1):
-            if self.verbose:
-                short_doc = str(doc_id)
-                if len(short_doc) > 80:
-                    short_doc = short_doc[:77] + "..."
-                print(f"[{i}] Evaluating doc_id={short_doc} | extraction_from={model_name} → calling Anthropic (OpenAI client)…")
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key("anthropic", self.model_cfg.model, self.system_prompt, user_prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if self.verbose:
+                    print(f"[{i}] Cache hit for doc_id={doc_id} | extraction_from={model_name}")
+                return cached_result(doc_id, model_name, cached)
 
-            user_prompt = self.build_user_prompt(original_text, extraction)
+        too_long = self.budget.exceeded(user_prompt)
+        if too_long:
+            if self.verbose:
+                print(f"[!] Skipping doc_id={doc_id} | model={model_name}: {too_long}")
+            return {
+                "document_idx": doc_id,
+                "model_evaluated": model_name,
+                "evaluation_data": None,
+                "token_usage": {},
+                "error": too_long,
+            }
 
-            # Use OpenAI Chat Completions with function tools, forcing the call, identical to openai runner
-            completion = self.client.chat.completions.create(
+        # Use OpenAI Chat Completions with function tools, forcing the call, identical to openai runner
+        if self.verbose:
+            short_doc = str(doc_id)
+            if len(short_doc) > 80:
+                short_doc = short_doc[:77] + "..."
+            print(f"[{i}] Evaluating doc_id={short_doc} | extraction_from={model_name} → calling Anthropic (OpenAI client)…")
+        try:
+            completion = await self.client.chat.completions.create(
                 model=self.model_cfg.model,
                 # temperature=self.model_cfg.temperature,
                 max_completion_tokens=self.model_cfg.max_output_tokens,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                tools=[
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": "save_evaluation",
-                            "description": "Saves the structured evaluation result of an extraction.",
-                            "parameters": DetailedEvaluation.model_json_schema(),
-                        },
-                    }
-                ],
-                tool_choice={"type": "function", "function": {"name": "save_evaluation"}},
+                messages=[self._system_message, {"role": "user", "content": user_prompt}],
+                tools=_TOOLS,
+                tool_choice=_TOOL_CHOICE,
             )
+        except APIError as e:
+            # Rate limits or timeouts left after the SDK's own retries: record the failure and let
+            # the other tasks finish; only successes are checkpointed, so a resumed run retries it
+            if self.verbose:
+                print(f"[!] API error for doc_id={doc_id} | model={model_name}: {e}")
+            return {
+                "document_idx": doc_id,
+                "model_evaluated": model_name,
+                "evaluation_data": None,
+                "token_usage": {},
+                "error": f"API error: {e}",
+            }
 
-            # Parse tool call arguments (JSON string)
-            try:
-                msg = completion.choices[0].message
-                tool_calls = getattr(msg, "tool_calls", None) or []
-                if tool_calls:
-                    json_arguments = tool_calls[0].function.arguments  # str
-                    evaluation = DetailedEvaluation.model_validate_json(json_arguments)
-                else:
-                    content = msg.content or "{}"
-                    evaluation = DetailedEvaluation.model_validate(json.loads(content))
-            except Exception as e:
-                # Do not stop the loop on parse/validation errors
-                if self.verbose:
-                    print(f"[!] Parsing error for doc_id={doc_id} | model={model_name}: {e}")
-                usage = completion.usage
-                token_usage = {
-                    "prompt_tokens": getattr(usage, 'prompt_tokens', None),
-                    "completion_tokens": getattr(usage, 'completion_tokens', None),
-                    "total_tokens": getattr(usage, 'total_tokens', None),
-                } if usage else {}
-                raw_content = None
-                try:
-                    # Try to capture the raw JSON that failed
-                    msg = completion.choices[0].message
-                    tool_calls = getattr(msg, "tool_calls", None) or []
-                    if tool_calls:
-                        raw_content = tool_calls[0].function.arguments
-                    else:
-                        raw_content = msg.content
-                except Exception:
-                    pass
-                results.append({
-                    "document_idx": doc_id,
-                    "model_evaluated": model_name,
-                    "evaluation_data": None,
-                    "token_usage": token_usage,
-                    "error": f"Pydantic parsing error: {e}",
-                    "raw_output": raw_content,
-                })
-                continue
-
+        # Parse tool call arguments (JSON string)
+        try:
+            msg = completion.choices[0].message
+            tool_calls = getattr(msg, "tool_calls", None) or []
+            if tool_calls:
+                json_arguments = tool_calls[0].function.arguments  # str
+                evaluation_data = decode_evaluation(json_arguments)
+            else:
+                content = msg.content or "{}"
+                evaluation_data = validate_evaluation(json.loads(content))
+        except Exception as e:
+            # Do not stop the loop on parse/validation errors
+            if self.verbose:
+                print(f"[!] Parsing error for doc_id={doc_id} | model={model_name}: {e}")
             usage = completion.usage
             token_usage = {
                 "prompt_tokens": getattr(usage, 'prompt_tokens', None),
                 "completion_tokens": getattr(usage, 'completion_tokens', None),
                 "total_tokens": getattr(usage, 'total_tokens', None),
             } if usage else {}
-
-            if self.verbose:
-                pt = token_usage.get("prompt_tokens")
-                ct = token_usage.get("completion_tokens")
-                tt = token_usage.get("total_tokens")
-                print(f"    ✓ Received evaluation. Tokens: prompt={pt} | completion={ct} | total={tt}")
-
-            results.append({
+            raw_content = None
+            try:
+                # Try to capture the raw JSON that failed
+                msg = completion.choices[0].message
+                tool_calls = getattr(msg, "tool_calls", None) or []
+                if tool_calls:
+                    raw_content = tool_calls[0].function.arguments
+                else:
+                    raw_content = msg.content
+            except Exception:
+                pass
+            return {
                 "document_idx": doc_id,
                 "model_evaluated": model_name,
-                "evaluation_data": evaluation.model_dump(),
+                "evaluation_data": None,
                 "token_usage": token_usage,
-            })
+                "error": f"Pydantic parsing error: {e}",
+                "raw_output": raw_content,
+            }
+
+        usage = completion.usage
+        token_usage = {
+            "prompt_tokens": getattr(usage, 'prompt_tokens', None),
+            "completion_tokens": getattr(usage, 'completion_tokens', None),
+            "total_tokens": getattr(usage, 'total_tokens', None),
+        } if usage else {}
+
+        if self.verbose:
+            pt = token_usage.get("prompt_tokens")
+            ct = token_usage.get("completion_tokens")
+            tt = token_usage.get("total_tokens")
+            print(f"    ✓ [{i}] Received evaluation. Tokens: prompt={pt} | completion={ct} | total={tt}")
+
+        result = {
+            "document_idx": doc_id,
+            "model_evaluated": model_name,
+            "evaluation_data": evaluation_data,
+            "token_usage": token_usage,
+        }
+        if self.cache is not None:
+            self.cache.put(cache_key, {"evaluation_data": result["evaluation_data"], "token_usage": token_usage})
+        return result
+
+    def evaluate(self, tasks: Iterable[Task]) -> List[Dict]:
+        """
+        Synchronous entry point; runs `evaluate_async` on a fresh event loop. Pooled connections
+        belong to that loop, so the pool is closed afterwards and a new client is prepared.
+        """
+        async def _run() -> List[Dict]:
+            try:
+                return await self.evaluate_async(tasks)
+            finally:
+                await self.aclose()
+
+        try:
+            return asyncio.run(_run())
+        finally:
+            self.client = self._build_client()
+
+    async def evaluate_async(
+        self,
+        tasks: Iterable[Task],
+        max_inflight: Optional[int] = None,
+        on_result: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Dict]:
+        """
+        `max_inflight` overrides `run.concurrency` for this call; `on_result` is called with each
+        result as soon as it completes.
+        """
+        max_inflight = max_inflight or self.concurrency
+        if self.verbose:
+            print("=== EVALUATION START (Anthropic via OpenAI client) ===")
+            print(f"Model: {self.model_cfg.model} | Max output tokens: {self.model_cfg.max_output_tokens} | Concurrency: {max_inflight}")
+
+        # A fixed pool of workers pulls from the (possibly lazy) task iterator, so tasks are
+        # consumed as they are produced and only `max_inflight` coroutines exist at a time.
+        pending = enumerate(tasks, start=1)
+        indexed: List[Tuple[int, Dict]] = []
+
+        async def _worker() -> None:
+            for i, task in pending:
+                result = await self._run_one(i, task)
+                if on_result is not None:
+                    on_result(result)
+                indexed.append((i, result))
+
+        await asyncio.gather(*(_worker() for _ in range(max_inflight)))
+        indexed.sort(key=lambda item: item[0])
+        results: List[Dict] = [result for _, result in indexed]
 
         if self.verbose:
             total = sum(((r.get("token_usage", {}) or {}).get("total_tokens") or 0) for r in results)
             print(f"=== EVALUATION END — items: {len(results)}, total_tokens: {total} ===")
+            if self.cache is not None:
+                print(f"Response {self.cache.summary()}")
         return results
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+
+def build_async_http_client(max_connections: int = 256):
+    """
+    Connection pool shared by every request of an evaluator: TLS connections are kept alive
+    and reused across tasks and multiplexed over HTTP/2 (`httpx[http2]` in requirements.txt).
+    """
+    import httpx
+    from openai import DefaultAsyncHttpxClient
+
+    return DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        # Same overall budget as the SDK default: long structured outputs can take minutes
+        timeout=httpx.Timeout(600.0, connect=10.0),
+    )
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.utils import split_batches
+from pydantic_models.output_struct_models import decode_evaluation, validate_evaluation
+
+from .openai_runner import _TOOL_CHOICE, _TOOLS, OpenAIEvaluator
+from .response_cache import ResponseCache, cached_result
+
+
+Task = Tuple[str, str, str, str]
+
+# Closes the user message, messages list, body and line opened by the prebuilt line prefix
+_LINE_SUFFIX = '}]}}\n'
+# Batch states after which polling stops
+_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Batch API input file limits; larger runs are split across several batches
+_MAX_BATCH_REQUESTS = 50_000
+_MAX_BATCH_BYTES = 200_000_000
+
+
+class OpenAIBatchEvaluator(OpenAIEvaluator):
+    """
+    OpenAI runner that submits all tasks through the Batch API instead of one request per task.
+    Batches are billed at half price and have separate (much larger) rate limits, but complete
+    asynchronously within the 24h window, so this is meant for offline evaluation runs.
+    Enabled with `run.mode: batch` (or `llm.batch_mode: true`).
+    """
+    def __init__(self, cfg: Dict):
+        super().__init__(cfg)
+        run_cfg = cfg.get('run', {})
+        self.poll_interval: float = float(run_cfg.get('batch_poll_seconds', 30))
+        # Runs smaller than this skip the batch queue and use regular concurrent requests
+        self.batch_min_size: int = max(1, int(run_cfg.get('batch_min_size', 1)))
+        # Everything in a batch line except custom_id and the user message (model, tool schema,
+        # system prompt) is the same for every task: serialize it once and splice per-task parts in
+        body_head = json.dumps({
+            "model": self.model_cfg.model,
+            "max_completion_tokens": self.model_cfg.max_output_tokens,
+            "tools": _TOOLS,
+            "tool_choice": _TOOL_CHOICE,
+        }, ensure_ascii=False)[:-1]
+        system_message = json.dumps(self._system_message, ensure_ascii=False)
+        self._line_prefix = (
+            f', "method": "POST", "url": "/v1/chat/completions", "body": {body_head}, '
+            f'"messages": [{system_message}, {{"role": "user", "content": '
+        )
+
+    def _batch_line(self, i: int, task: Task, user_prompt: str) -> str:
+        """One JSONL line of the batch input file for task `i` (newline included)."""
+        doc_id, _, _, model_name = task
+        # The index prefix keeps ids unique and lets results be mapped back to their task
+        custom_id = json.dumps(f"{i}#{doc_id}#{model_name}", ensure_ascii=False)
+        user_content = json.dumps(user_prompt, ensure_ascii=False)
+        return f'{{"custom_id": {custom_id}{self._line_prefix}{user_content}{_LINE_SUFFIX}'
+
+    def _result_from_line(self, task: Task, line: Optional[Dict]) -> Dict:
+        doc_id, _, _, model_name = task
+        result = {
+            "document_idx": doc_id,
+            "model_evaluated": model_name,
+            "evaluation_data": None,
+            "token_usage": {},
+        }
+        if line is None:
+            result["error"] = "Batch API returned no output for this task"
+            return result
+
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        usage = body.get("usage")
+        if usage:
+            result["token_usage"] = {
+                "prompt_tokens": usage.get('prompt_tokens'),
+                "completion_tokens": usage.get('completion_tokens'),
+                "total_tokens": usage.get('total_tokens'),
+            }
+        if line.get("error") or response.get("status_code") != 200:
+            result["error"] = f"Batch request failed: {line.get('error') or body.get('error')}"
+            return result
+
+        raw_content = None
+        try:
+            msg = body["choices"][0]["message"]
+            tool_calls = msg.get("tool_calls") or []
+            if tool_calls:
+                raw_content = tool_calls[0]["function"]["arguments"]  # str
+                evaluation_data = decode_evaluation(raw_content)
+            else:
+                raw_content = msg.get("content") or "{}"
+                evaluation_data = validate_evaluation(json.loads(raw_content))
+        except Exception as e:
+            if self.verbose:
+                print(f"[!] Parsing error for doc_id={doc_id} | model={model_name}: {e}")
+            result["error"] = f"Pydantic parsing error: {e}"
+            result["raw_output"] = raw_content
+            return result
+
+        result["evaluation_data"] = evaluation_data
+        return result
+
+    async def _download_lines(self, file_id: Optional[str]) -> List[Dict]:
+        if not file_id:
+            return []
+        content = await self.client.files.content(file_id)
+        return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+    async def _run_batch(self, lines: List[bytes]) -> Dict[int, Dict]:
+        """Submit one batch of encoded input lines, wait for it and return output lines by task index."""
+        payload = b"".join(lines)
+        input_file = await self.client.files.create(file=("evaluation_batch.jsonl", payload), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        if self.verbose:
+            print(f"Submitted batch {batch.id} ({len(lines)} requests). Polling every {self.poll_interval:g}s…")
+
+        while batch.status not in _TERMINAL_STATUSES:
+            await asyncio.sleep(self.poll_interval)
+            batch = await self.client.batches.retrieve(batch.id)
+            if self.verbose:
+                counts = batch.request_counts
+                done = f"{counts.completed}/{counts.total}" if counts else "?"
+                print(f"    Batch {batch.id}: status={batch.status} | completed={done}")
+
+        if batch.status != "completed" and self.verbose:
+            print(f"[!] Batch {batch.id} ended with status={batch.status}; unfinished tasks are recorded as errors.")
+
+        # Successful and failed requests come back in separate files; custom_id maps them to tasks
+        by_index: Dict[int, Dict] = {}
+        for line in await self._download_lines(batch.output_file_id) + await self._download_lines(batch.error_file_id):
+            by_index[int(str(line.get("custom_id", "0")).split("#", 1)[0])] = line
+        return by_index
+
+    async def evaluate_async(
+        self,
+        tasks: Iterable[Task],
+        max_inflight: Optional[int] = None,
+        on_result: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Dict]:
+        """
+        Upload all tasks (except response-cache hits) as JSONL batches, split to stay within the
+        Batch API's per-file limits, poll until they finish and map the outputs back to the input
+        order. Tasks missing from the output are reported
+        as error results. `max_inflight` only applies when the run is below `run.batch_min_size`
+        and falls back to regular requests; otherwise the provider schedules the batch itself.
+        `on_result` is called for cache hits right away and for the other tasks once the batch
+        have ended.
+        """
+        tasks = list(tasks)
+        if len(tasks) < self.batch_min_size:
+            if self.verbose:
+                print(f"{len(tasks)} tasks < run.batch_min_size={self.batch_min_size}; sending them as regular requests.")
+            return await super().evaluate_async(tasks, max_inflight=max_inflight, on_result=on_result)
+        if self.verbose:
+            print("=== EVALUATION START (OpenAI Batch API) ===")
+            print(f"Model: {self.model_cfg.model} | Max output tokens: {self.model_cfg.max_output_tokens} | Tasks: {len(tasks)}")
+        if not tasks:
+            return []
+
+        results: List[Optional[Dict]] = [None] * len(tasks)
+        # (task index, task, rendered user prompt, response-cache key)
+        pending: List[Tuple[int, Task, str, Optional[str]]] = []
+        for i, (doc_id, original_text, extraction, model_name) in enumerate(tasks, start=1):
+            user_prompt = self.build_user_prompt(original_text, extraction)
+            cache_key = None
+            if self.cache is not None:
+                cache_key = ResponseCache.key("openai", self.model_cfg.model, self.system_prompt, user_prompt)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    results[i - 1] = cached_result(doc_id, model_name, cached)
+                    if on_result is not None:
+                        on_result(results[i - 1])
+                    continue
+            too_long = self.budget.exceeded(user_prompt)
+            if too_long:
+                results[i - 1] = {
+                    "document_idx": doc_id,
+                    "model_evaluated": model_name,
+                    "evaluation_data": None,
+                    "token_usage": {},
+                    "error": too_long,
+                }
+                continue
+            pending.append((i, tasks[i - 1], user_prompt, cache_key))
+
+        if pending:
+            lines = [self._batch_line(i, task, prompt).encode('utf-8') for i, task, prompt, _ in pending]
+            groups = split_batches(lines, _MAX_BATCH_REQUESTS, _MAX_BATCH_BYTES)
+            # custom_ids carry the task index, so the per-batch maps merge without collisions
+            by_index: Dict[int, Dict] = {}
+            for batch_lines in await asyncio.gather(*(self._run_batch(group) for group in groups)):
+                by_index.update(batch_lines)
+            for i, task, _, cache_key in pending:
+                result = self._result_from_line(task, by_index.get(i))
+                if self.cache is not None and result["evaluation_data"] is not None:
+                    self.cache.put(cache_key, {"evaluation_data": result["evaluation_data"], "token_usage": result["token_usage"]})
+                results[i - 1] = result
+                if on_result is not None:
+                    on_result(result)
+
+        if self.verbose:
+            total = sum(((r.get("token_usage", {}) or {}).get("total_tokens") or 0) for r in results)
+            print(f"=== EVALUATION END — items: {len(results)}, total_tokens: {total} ===")
+            if self.cache is not None:
+                print(f"Response {self.cache.summary()}")
+        return results
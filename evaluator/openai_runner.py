@@ -1,14 +1,35 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from openai import OpenAI
+from openai import APIError, AsyncOpenAI
 
-from core.utils import read_text_file
-from pydantic_models.output_pydantic_models import DetailedEvaluation
+from core.utils import compile_template, read_text_file
+from pydantic_models.output_pydantic_models import DETAILED_EVALUATION_ADAPTER
+from pydantic_models.output_struct_models import decode_evaluation, validate_evaluation
+
+from .http_client import build_async_http_client
+from .response_cache import ResponseCache, cached_result
+from .token_budget import TokenBudget
+
+
+# Tool definition is identical for every request: build the JSON schema once at import time
+_SCHEMA = DETAILED_EVALUATION_ADAPTER.json_schema()
+_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "save_evaluation",
+            "description": "Saves the structured evaluation result of an extraction.",
+            "parameters": _SCHEMA,
+        },
+    }
+]
+_TOOL_CHOICE = {"type": "function", "function": {"name": "save_evaluation"}}
 
 
 @dataclass
@@ -31,10 +52,27 @@ class OpenAIEvaluator:
         prompts = cfg.get('prompts', {})
         self.system_prompt = read_text_file_path(prompts.get('system_prompt_path', 'prompts/system_evaluation_prompt.txt'))
         self.user_prompt_template = read_text_file_path(prompts.get('user_prompt_path', 'prompts/user_evaluation_prompt.txt'))
+        # Parse the template once; rendering per task is then plain string concatenation.
+        self._render_user_prompt = compile_template(self.user_prompt_template)
+        # Only the user message changes per task; reuse the system message dict
+        self._system_message = {"role": "system", "content": self.system_prompt}
+        # Local token count to skip requests that cannot fit the model's context window
+        self.budget = TokenBudget(
+            self.model_cfg.model,
+            self.model_cfg.max_output_tokens,
+            self.system_prompt + json.dumps(_SCHEMA),
+            context_window=int(llm['context_window']) if llm.get('context_window') else None,
+        )
 
         # Logging / verbosity
         run_cfg = cfg.get('run', {})
         self.verbose: bool = bool(run_cfg.get('verbose', True))
+        # Number of requests in flight at once; all of them share one event loop and connection pool
+        self.concurrency: int = max(1, int(run_cfg.get('concurrency', 8)))
+        # Optional disk cache of results keyed by (provider, model, system prompt, user prompt);
+        # `run.cache_enabled: false` turns it off without dropping the directory setting
+        cache_dir = run_cfg.get('cache_dir') if run_cfg.get('cache_enabled', True) else None
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
 
         # Resolve API key: prefer env var, then optional cfg override at llm.api_key
         api_key = os.getenv("OPENAI_API_KEY") or llm.get('api_key')
@@ -45,116 +83,197 @@ class OpenAIEvaluator:
                 "for persistent setx OPENAI_API_KEY '...' and open a new terminal."
             )
         # Initialize client with explicit key to avoid discovery issues
-        self.client = OpenAI(api_key=api_key)
+        self._client_kwargs = {"api_key": api_key}
+        self.client = self._build_client()
         if self.verbose:
             print(f"OpenAI client initialized. Model: {self.model_cfg.model}. Max tokens: {self.model_cfg.max_output_tokens}")
 
+    def _build_client(self):
+        # One keep-alive pool for the whole run instead of a TLS handshake per request
+        http_client = build_async_http_client(max_connections=max(256, self.concurrency))
+        return AsyncOpenAI(**self._client_kwargs, http_client=http_client)
+
+    async def aclose(self) -> None:
+        """Close the client and its connection pool."""
+        await self.client.close()
+
     def build_user_prompt(self, original_document: str, extraction_to_evaluate: str) -> str:
-        return self.user_prompt_template.format(
+        return self._render_user_prompt(
             original_document=original_document,
             extraction_to_evaluate=extraction_to_evaluate,
         )
 
-    def evaluate(self, tasks: Iterable[Tuple[str, str, str, str]]) -> List[Dict]:
+    async def _run_one(self, i: int, task: Tuple[str, str, str, str]) -> Dict:
         """
-        Run evaluation over prepared tasks.
-        Each task is a tuple: (doc_id, original_text, extraction_to_evaluate, model_name)
-        Returns list of result dicts suitable for JSON serialization.
+        Evaluate a single task and return its result dict. Never raises on parsing errors;
+        those are recorded in the result so the rest of the batch keeps going.
         """
-        results: List[Dict] = []
-        if self.verbose:
-            print("=== EVALUATION START ===")
-            print(f"Model: {self.model_cfg.model} | Max output tokens: {self.model_cfg.max_output_tokens}")
-        for i, (doc_id, original_text, extraction, model_name) in enumerate(tasks, start=1):
+        doc_id, original_text, extraction, model_name = task
+        user_prompt = self.build_user_prompt(original_text, extraction)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key("openai", self.model_cfg.model, self.system_prompt, user_prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if self.verbose:
+                    print(f"[{i}] Cache hit for doc_id={doc_id} | extraction_from={model_name}")
+                return cached_result(doc_id, model_name, cached)
+
+        too_long = self.budget.exceeded(user_prompt)
+        if too_long:
             if self.verbose:
-                short_doc = str(doc_id)
-                if len(short_doc) > 80:
-                    short_doc = short_doc[:77] + "..."
-                print(f"[{i}] Evaluating doc_id={short_doc} | extraction_from={model_name} → calling OpenAI…")
-            user_prompt = self.build_user_prompt(original_text, extraction)
+                print(f"[!] Skipping doc_id={doc_id} | model={model_name}: {too_long}")
+            return {
+                "document_idx": doc_id,
+                "model_evaluated": model_name,
+                "evaluation_data": None,
+                "token_usage": {},
+                "error": too_long,
+            }
 
-            completion = self.client.chat.completions.create(
+        if self.verbose:
+            short_doc = str(doc_id)
+            if len(short_doc) > 80:
+                short_doc = short_doc[:77] + "..."
+            print(f"[{i}] Evaluating doc_id={short_doc} | extraction_from={model_name} → calling OpenAI…")
+        try:
+            completion = await self.client.chat.completions.create(
                 model=self.model_cfg.model,
                 # temperature=self.model_cfg.temperature,
                 max_completion_tokens=self.model_cfg.max_output_tokens,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                tools=[
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": "save_evaluation",
-                            "description": "Saves the structured evaluation result of an extraction.",
-                            "parameters": DetailedEvaluation.model_json_schema(),
-                        },
-                    }
-                ],
-                tool_choice={"type": "function", "function": {"name": "save_evaluation"}},
+                messages=[self._system_message, {"role": "user", "content": user_prompt}],
+                tools=_TOOLS,
+                tool_choice=_TOOL_CHOICE,
             )
+        except APIError as e:
+            # Rate limits or timeouts left after the SDK's own retries: record the failure and let
+            # the other tasks finish; only successes are checkpointed, so a resumed run retries it
+            if self.verbose:
+                print(f"[!] API error for doc_id={doc_id} | model={model_name}: {e}")
+            return {
+                "document_idx": doc_id,
+                "model_evaluated": model_name,
+                "evaluation_data": None,
+                "token_usage": {},
+                "error": f"API error: {e}",
+            }
 
-            # Prefer tool calls (tools output is a JSON string in arguments)
+        # Prefer tool calls (tools output is a JSON string in arguments)
+        try:
+            msg = completion.choices[0].message
+            tool_calls = getattr(msg, "tool_calls", None) or []
+            if tool_calls:
+                json_arguments = tool_calls[0].function.arguments  # str
+                evaluation_data = decode_evaluation(json_arguments)
+            else:
+                # Fallback: try to parse assistant content as JSON (legacy path)
+                content = msg.content or "{}"
+                raw_obj = json.loads(content)
+                evaluation_data = validate_evaluation(raw_obj)
+        except Exception:
+            # Last-resort fallback to avoid crashing the whole batch
+            content = (completion.choices[0].message.content or "{}")
             try:
-                msg = completion.choices[0].message
-                tool_calls = getattr(msg, "tool_calls", None) or []
-                if tool_calls:
-                    json_arguments = tool_calls[0].function.arguments  # str
-                    evaluation = DetailedEvaluation.model_validate_json(json_arguments)
-                else:
-                    # Fallback: try to parse assistant content as JSON (legacy path)
-                    content = msg.content or "{}"
-                    raw_obj = json.loads(content)
-                    evaluation = DetailedEvaluation.model_validate(raw_obj)
-            except Exception:
-                # Last-resort fallback to avoid crashing the whole batch
-                content = (completion.choices[0].message.content or "{}")
-                try:
-                    raw_obj = json.loads(content)
-                    evaluation = DetailedEvaluation.model_validate(raw_obj)
-                except Exception as e:
-                    # Do not stop iteration: record error and continue
-                    if self.verbose:
-                        print(f"[!] Parsing error for doc_id={doc_id} | model={model_name}: {e}")
-                    usage = completion.usage
-                    token_usage = {
-                        "prompt_tokens": getattr(usage, 'prompt_tokens', None),
-                        "completion_tokens": getattr(usage, 'completion_tokens', None),
-                        "total_tokens": getattr(usage, 'total_tokens', None),
-                    } if usage else {}
-                    results.append({
-                        "document_idx": doc_id,
-                        "model_evaluated": model_name,
-                        "evaluation_data": None,
-                        "token_usage": token_usage,
-                        "error": f"Pydantic parsing error: {e}",
-                        "raw_output": content,
-                    })
-                    continue
-
-            # Collect token usage if available
-            usage = completion.usage
-            token_usage = {
-                "prompt_tokens": getattr(usage, 'prompt_tokens', None),
-                "completion_tokens": getattr(usage, 'completion_tokens', None),
-                "total_tokens": getattr(usage, 'total_tokens', None),
-            } if usage else {}
+                raw_obj = json.loads(content)
+                evaluation_data = validate_evaluation(raw_obj)
+            except Exception as e:
+                # Do not stop iteration: record error and continue
+                if self.verbose:
+                    print(f"[!] Parsing error for doc_id={doc_id} | model={model_name}: {e}")
+                usage = completion.usage
+                token_usage = {
+                    "prompt_tokens": getattr(usage, 'prompt_tokens', None),
+                    "completion_tokens": getattr(usage, 'completion_tokens', None),
+                    "total_tokens": getattr(usage, 'total_tokens', None),
+                } if usage else {}
+                return {
+                    "document_idx": doc_id,
+                    "model_evaluated": model_name,
+                    "evaluation_data": None,
+                    "token_usage": token_usage,
+                    "error": f"Pydantic parsing error: {e}",
+                    "raw_output": content,
+                }
 
-            if self.verbose:
-                pt = token_usage.get("prompt_tokens")
-                ct = token_usage.get("completion_tokens")
-                tt = token_usage.get("total_tokens")
-                print(f"    ✓ Received evaluation. Tokens: prompt={pt} | completion={ct} | total={tt}")
+        # Collect token usage if available
+        usage = completion.usage
+        token_usage = {
+            "prompt_tokens": getattr(usage, 'prompt_tokens', None),
+            "completion_tokens": getattr(usage, 'completion_tokens', None),
+            "total_tokens": getattr(usage, 'total_tokens', None),
+        } if usage else {}
 
-            results.append({
-                "document_idx": doc_id,
-                "model_evaluated": model_name,
-                "evaluation_data": evaluation.model_dump(),
-                "token_usage": token_usage,
-            })
+        if self.verbose:
+            pt = token_usage.get("prompt_tokens")
+            ct = token_usage.get("completion_tokens")
+            tt = token_usage.get("total_tokens")
+            print(f"    ✓ [{i}] Received evaluation. Tokens: prompt={pt} | completion={ct} | total={tt}")
+
+        result = {
+            "document_idx": doc_id,
+            "model_evaluated": model_name,
+            "evaluation_data": evaluation_data,
+            "token_usage": token_usage,
+        }
+        if self.cache is not None:
+            self.cache.put(cache_key, {"evaluation_data": result["evaluation_data"], "token_usage": token_usage})
+        return result
+
+    def evaluate(self, tasks: Iterable[Tuple[str, str, str, str]]) -> List[Dict]:
+        """
+        Synchronous entry point; runs `evaluate_async` on a fresh event loop. Pooled connections
+        belong to that loop, so the pool is closed afterwards and a new client is prepared.
+        """
+        async def _run() -> List[Dict]:
+            try:
+                return await self.evaluate_async(tasks)
+            finally:
+                await self.aclose()
+
+        try:
+            return asyncio.run(_run())
+        finally:
+            self.client = self._build_client()
+
+    async def evaluate_async(
+        self,
+        tasks: Iterable[Tuple[str, str, str, str]],
+        max_inflight: Optional[int] = None,
+        on_result: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Dict]:
+        """
+        Run evaluation over prepared tasks.
+        Each task is a tuple: (doc_id, original_text, extraction_to_evaluate, model_name)
+        At most `max_inflight` (default `run.concurrency`) requests are in flight at once;
+        results keep the input order. `on_result`, if given, is called with each result as soon
+        as it completes (e.g. to checkpoint it).
+        Returns list of result dicts suitable for JSON serialization.
+        """
+        max_inflight = max_inflight or self.concurrency
+        if self.verbose:
+            print("=== EVALUATION START ===")
+            print(f"Model: {self.model_cfg.model} | Max output tokens: {self.model_cfg.max_output_tokens} | Concurrency: {max_inflight}")
+        # A fixed pool of workers pulls from the (possibly lazy) task iterator, so tasks are
+        # consumed as they are produced and only `max_inflight` coroutines exist at a time.
+        pending = enumerate(tasks, start=1)
+        indexed: List[Tuple[int, Dict]] = []
+
+        async def _worker() -> None:
+            for i, task in pending:
+                result = await self._run_one(i, task)
+                if on_result is not None:
+                    on_result(result)
+                indexed.append((i, result))
+
+        await asyncio.gather(*(_worker() for _ in range(max_inflight)))
+        indexed.sort(key=lambda item: item[0])
+        results: List[Dict] = [result for _, result in indexed]
         if self.verbose:
             total = sum(((r.get("token_usage", {}) or {}).get("total_tokens") or 0) for r in results)
             print(f"=== EVALUATION END — items: {len(results)}, total_tokens: {total} ===")
+            if self.cache is not None:
+                print(f"Response {self.cache.summary()}")
         return results
 
 
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import orjson
+
+
+class ResponseCache:
+    """
+    Disk cache of successful evaluation results, one JSON file per request hash.
+    A hit returns the stored `evaluation_data` without calling the API (see `cached_result`).
+    """
+    def __init__(self, cache_dir: str):
+        self.root = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        # Two-level fan-out keeps directories small on large sweeps
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            raw = self._path(key).read_bytes()
+            value = orjson.loads(raw)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS))
+        os.replace(tmp, path)
+
+    def summary(self) -> str:
+        return f"cache hits={self.hits} | misses={self.misses}"
+
+
+def cached_result(doc_id: str, model_name: str, cached: Dict) -> Dict:
+    """
+    Result dict for a cache hit. No tokens were spent on it, so `token_usage` is zero and the
+    run's `total_tokens` only counts real API usage; the original usage is kept for reference.
+    """
+    return {
+        "document_idx": doc_id,
+        "model_evaluated": model_name,
+        "evaluation_data": cached.get("evaluation_data"),
+        "token_usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        "cached": True,
+        "cached_token_usage": cached.get("token_usage") or {},
+    }
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+# Context windows (input + output tokens) by model-name prefix; the longest matching prefix wins,
+# so dated or aliased names such as 'gpt-5-mini-2025-08-07' or 'claude-3-5-haiku-latest' resolve.
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    'gpt-5': 400_000,
+    'gpt-4.1': 1_047_576,
+    'gpt-4o': 128_000,
+    'o3': 200_000,
+    'o4-mini': 200_000,
+    'claude-3-5-haiku': 200_000,
+    'claude-3-5-sonnet': 200_000,
+    'claude-3-7-sonnet': 200_000,
+    'claude-sonnet-4': 200_000,
+    'claude-opus-4': 200_000,
+    'gemini-2.5-flash': 1_048_576,
+    'gemini-2.5-pro': 1_048_576,
+}
+
+
+def context_window_for(model: str) -> Optional[int]:
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return None
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def _load_encoding(model: str):
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+class TokenBudget:
+    """
+    Counts prompt tokens locally with tiktoken so requests that cannot fit the model's context
+    window are rejected before any network round trip. Counts for non-OpenAI models use an
+    OpenAI encoding and are approximate. The check is disabled when tiktoken is not installed
+    or cannot load its encoding (e.g. offline), or when the context window is unknown (set
+    `llm.context_window` to provide one).
+    """
+    def __init__(self, model: str, max_output_tokens: int, static_prompt: str, context_window: Optional[int] = None):
+        self.model = model
+        self.max_output_tokens = max_output_tokens
+        self.context_window = context_window or context_window_for(model)
+        self._enc = None
+        self._static_tokens = 0
+        if self.context_window is None:
+            return
+        try:
+            enc = _load_encoding(model)
+        except Exception:
+            # Missing tiktoken, or its BPE file can't be downloaded (offline): skip the check
+            return
+        self._enc = enc
+        # System prompt and tool schema are the same for every request: count them once.
+        # encode_ordinary treats text such as '<|endoftext|>' in a document as plain text;
+        # encode() would raise ValueError on it.
+        self._static_tokens = len(enc.encode_ordinary(static_prompt))
+
+    def exceeded(self, user_prompt: str) -> Optional[str]:
+        """Return an error message if the request cannot fit the context window, else None."""
+        if self._enc is None:
+            return None
+        n = self._static_tokens + len(self._enc.encode_ordinary(user_prompt))
+        if n + self.max_output_tokens <= self.context_window:
+            return None
+        return (
+            f"Prompt too long: ~{n} input tokens + {self.max_output_tokens} output tokens exceed "
+            f"the {self.context_window}-token context window of {self.model}"
+        )
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 import os
 
 # Load environment variables from a .env file if present (before importing anything that might use them)
@@ -15,7 +16,18 @@ except Exception:
 
 from core.config_loader import load_config
 from core.datasets import get_plugin
-from core.utils import ensure_dir, result_filename, review_filename, write_json
+from core.utils import (
+    append_jsonl,
+    checkpoint_filename,
+    ensure_dir,
+    preprocessed_filename,
+    progress,
+    read_jsonl,
+    result_filename,
+    review_filename,
+    write_json,
+    write_jsonl,
+)
 from evaluator import get_evaluator
 from validation.create_expert_review_task import create_expert_review_task
 from validation.json_to_excel import create_excel_for_review
@@ -46,16 +58,19 @@ def iter_tasks(plugin_name: str, cfg: dict, limit: int | None = None) -> Iterabl
     if verbose:
         print(f"=== PREPARE START [{plugin_name}] ===")
     produced = 0
-    for doc in docs:
-        for task in plugin.prepare_tasks(doc):
-            yield task
-            produced += 1
-            if verbose and produced % 10 == 0:
-                print(f"Prepare: yielded {produced} tasks…")
-            if limit and limit > 0 and produced >= limit:
-                if verbose:
-                    print(f"Prepare: reached limit {limit}.")
-                return
+    bar = progress("Prepare: yielded tasks", total=limit if limit and limit > 0 else None, enabled=verbose)
+    try:
+        for doc in docs:
+            for task in plugin.prepare_tasks(doc):
+                yield task
+                produced += 1
+                bar.update(1)
+                if limit and limit > 0 and produced >= limit:
+                    if verbose:
+                        print(f"Prepare: reached limit {limit}.")
+                    return
+    finally:
+        bar.close()
 
 
 def run_preprocess_only(dataset: str, cfg: dict, limit: int | None = None) -> List[dict]:
@@ -64,6 +79,12 @@ def run_preprocess_only(dataset: str, cfg: dict, limit: int | None = None) -> Li
     if limit and limit > 0:
         docs = docs[:limit]
     print(f"Preprocess: produced {len(docs)} docs for dataset {dataset}")
+
+    results_dir = Path(cfg.get('paths', {}).get('results_dir', 'results'))
+    ensure_dir(results_dir)
+    out_path = preprocessed_filename(cfg.get('run', {}).get('environment', 'development'), dataset, results_dir)
+    write_jsonl(out_path, docs)
+    print(f"Saved preprocessed docs to: {out_path}")
     return docs
 
 
@@ -84,6 +105,14 @@ def run_prepare_only(dataset: str, cfg: dict, limit: int | None = None) -> List[
     return tasks
 
 
+async def _evaluate_all(evaluator, tasks: Iterable[Task], max_inflight: int, on_result=None) -> List[dict]:
+    """Dispatch all tasks on one event loop, at most `max_inflight` requests at a time."""
+    try:
+        return await evaluator.evaluate_async(tasks, max_inflight=max_inflight, on_result=on_result)
+    finally:
+        await evaluator.aclose()
+
+
 def run_evaluate(dataset: str, cfg: dict, limit: int | None = None) -> dict:
     env = cfg.get('run', {}).get('environment', 'development')
     provider = cfg.get('llm', {}).get('provider', 'openai')
@@ -100,9 +129,78 @@ def run_evaluate(dataset: str, cfg: dict, limit: int | None = None) -> dict:
 
     evaluator = get_evaluator(cfg)
 
-    # Build tasks once (cache) to avoid re-running preprocess/prepare
-    tasks = list(iter_tasks(dataset, cfg, limit=limit))
-    results_list = evaluator.evaluate(iter(tasks))
+    # Successful results are appended to a checkpoint as they complete; a re-run after an
+    # interruption skips the (doc_id, model_name) pairs already in it.
+    checkpoint_path = checkpoint_filename(env, dataset, provider, model, results_dir)
+    done = {(r.get("document_idx"), r.get("model_evaluated")): r for r in read_jsonl(checkpoint_path)}
+    if verbose and done:
+        print(f"Resuming from {checkpoint_path}: {len(done)} tasks already evaluated")
+
+    # Tasks are streamed into the evaluator as they are prepared, so the first requests go out
+    # while later documents are still being turned into tasks. Each task is also kept (once)
+    # for the review step below.
+    tasks: List[Task] = []
+    # With run.deduplicate, tasks with the same (original_text, extraction) are sent once and the
+    # result is shared; the key maps to the position of the submitted task in the evaluator input.
+    dedup = bool(cfg.get('run', {}).get('deduplicate', True))
+    content_key = (lambda t: (t[1], t[2])) if dedup else (lambda t: t)
+    submitted: Dict[tuple, int] = {}
+    # Same key -> result already in the checkpoint, so later duplicates of it aren't sent again
+    checkpointed: Dict[tuple, dict] = {}
+
+    def _remaining_tasks() -> Iterable[Task]:
+        for t in iter_tasks(dataset, cfg, limit=limit):
+            tasks.append(t)
+            key = content_key(t)
+            previous = done.get((t[0], t[3]))
+            if previous is not None:
+                checkpointed.setdefault(key, previous)
+                continue
+            if key in submitted or key in checkpointed:
+                continue
+            submitted[key] = len(submitted)
+            yield t
+
+    max_inflight = max(1, int(cfg.get('run', {}).get('concurrency', 8)))
+    with checkpoint_path.open('a', encoding='utf-8') as checkpoint:
+        if checkpoint.tell() and not checkpoint_path.read_bytes().endswith(b'\n'):
+            # Terminate a line cut off by a crash so the next record starts on its own line
+            checkpoint.write('\n')
+
+        def _checkpoint(result: dict) -> None:
+            if result.get("evaluation_data") is not None:
+                append_jsonl(checkpoint, result)
+
+        new_results = asyncio.run(_evaluate_all(evaluator, _remaining_tasks(), max_inflight, on_result=_checkpoint))
+
+    # Reassemble in task order so results stay aligned with `tasks` below
+    results_list = []
+    reused = []
+    for t in tasks:
+        if (t[0], t[3]) in done:
+            results_list.append(done[(t[0], t[3])])
+            continue
+        key = content_key(t)
+        r = new_results[submitted[key]] if key in submitted else checkpointed[key]
+        if (r.get("document_idx"), r.get("model_evaluated")) != (t[0], t[3]):
+            # Duplicate content: reuse the evaluation without counting its tokens twice
+            r = {
+                **r,
+                "document_idx": t[0],
+                "model_evaluated": t[3],
+                "token_usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                "duplicate_of": {"document_idx": r.get("document_idx"), "model_evaluated": r.get("model_evaluated")},
+            }
+            reused.append(r)
+        results_list.append(r)
+    if verbose and reused:
+        print(f"Deduplication: {len(reused)} tasks reused the result of an identical (document, extraction) pair")
+    # Checkpoint the reused copies too, so a resumed run treats them as done
+    if reused:
+        with checkpoint_path.open('a', encoding='utf-8') as checkpoint:
+            for r in reused:
+                if r.get("evaluation_data") is not None:
+                    append_jsonl(checkpoint, r)
 
     # Build final JSON structure similar to existing outputs
     final = {
@@ -112,6 +210,12 @@ def run_evaluate(dataset: str, cfg: dict, limit: int | None = None) -> dict:
 
     results_path = result_filename(env, dataset, provider, model, results_dir)
     write_json(results_path, final)
+    failed = sum(1 for r in results_list if r.get("evaluation_data") is None)
+    if failed:
+        # Only successes are in the checkpoint, so re-running the same command retries just these
+        print(f"{failed} tasks failed; kept {checkpoint_path} so a re-run only retries them")
+    else:
+        checkpoint_path.unlink(missing_ok=True)
     print(f"Saved evaluation results to: {results_path}")
 
     # Optional: generate review tasks JSON
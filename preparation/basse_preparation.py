@@ -1,14 +1,26 @@
+# Extraction fields written by preprocessing.basse_preprocessing, and the model name each one maps to.
+# Every BASSE entry has the same keys, so they are listed once instead of scanned per entry.
+_BASSE_MODEL_KEYS = (
+    'claude-5w1h_summ',
+    'commandr-5w1h_summ',
+    'gpt4o-5w1h_summ',
+    'reka-5w1h_summ',
+    'llama3-5w1h_summ',
+)
+_BASSE_MODEL_NAMES = tuple(key.replace('-5w1h_summ', '') for key in _BASSE_MODEL_KEYS)
+
+
 def prepare_basse_tasks(doc_entry: dict):
     """
     Generator that yields evaluation tasks from a BASSE dataset entry.
-    An entry can yield multiple tasks (one per model extraction).
+    An entry can yield multiple tasks (one per model extraction); models without an
+    extraction for this entry are skipped.
     """
     doc_id = doc_entry["idx"]
     original_text = doc_entry["original_document"]
-    extraction_keys = [key for key in doc_entry if key.endswith('_summ')]
 
-    for key in extraction_keys:
-        model_name = key.replace('-5w1h_summ', '')
-        extraction_to_evaluate = doc_entry[key]
-        # Yield a standardized task tuple
-        yield doc_id, original_text, extraction_to_evaluate, model_name
+    for key, model_name in zip(_BASSE_MODEL_KEYS, _BASSE_MODEL_NAMES):
+        extraction_to_evaluate = doc_entry.get(key)
+        if extraction_to_evaluate is not None:
+            # Yield a standardized task tuple
+            yield doc_id, original_text, extraction_to_evaluate, model_name
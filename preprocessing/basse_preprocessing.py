@@ -1,22 +1,53 @@
-import json
+from functools import partial
 from pathlib import Path
 
+import orjson
+
+from preprocessing.jsonl_reader import iter_jsonl_records
+
+
+def _parse_basse_line(json_object, key_name):
+    """
+    (Internal Helper) Turns one decoded BASSE JSON object into a flat dict with one summary per model.
+    Module-level (and bound with functools.partial) so it can run in a worker process.
+    """
+    model_extractions = json_object.get(key_name, {})
+    return {
+        'idx': json_object.get('idx'),
+        'round': json_object.get('round'),
+        'original_document': json_object.get('original_document'),
+        'claude-5w1h_summ': model_extractions.get('claude-5w1h', {}).get('summ'),
+        'commandr-5w1h_summ': model_extractions.get('commandr-5w1h', {}).get('summ'),
+        'gpt4o-5w1h_summ': model_extractions.get('gpt4o-5w1h', {}).get('summ'),
+        'reka-5w1h_summ': model_extractions.get('reka-5w1h', {}).get('summ'),
+        'llama3-5w1h_summ': model_extractions.get('llama3-5w1h', {}).get('summ'),
+    }
+
+
+def _describe_basse_error(error, line):
+    text = line.strip().decode('utf-8', 'replace')
+    if isinstance(error, orjson.JSONDecodeError):
+        return f"Skipped line (extractions) due to JSON decoding error: {text}"
+    return f"Skipped line (extractions) due to an unexpected error ({error}): {text}"
+
 
 # # BASSE dataset
 # Processes a JSONL file of extractions and returns a list of objects (dictionaries). Each object contains the index,
 # the original document, and extractions from various models.
-def get_list_of_objects_from_basse_dataset(filepath):
+def get_list_of_objects_from_basse_dataset(filepath, key_name='model_summaries'):
     """
     Processes a JSONL file of extractions and returns a list of objects (dictionaries).
+    Files of 5 MB or more are split into line-aligned chunks parsed in parallel worker processes;
+    the output order is the file order either way.
 
     Args:
         filepath (str): The path to the .jsonl file.
+        key_name (str): Field holding the per-model outputs ('model_summaries' in BASSE.jsonl;
+            'model_extractions' in older exports).
 
     Returns:
         list: A list of dictionaries, where each dictionary represents a processed JSON object.
     """
-    data_list = []
-
     # Convert relative path to absolute path
     abs_path = Path(filepath).resolve()
 
@@ -24,45 +55,13 @@ def get_list_of_objects_from_basse_dataset(filepath):
         raise FileNotFoundError(f"The BASSE dataset file was not found at: {abs_path}\n"
                                 f"Please ensure the file exists and the path is correct.")
 
-    with open(abs_path, 'r', encoding='utf-8') as f:
-        for line_number, line in enumerate(f, 1):
-            try:
-                json_object = json.loads(line.strip())
-
-                idx = json_object.get('idx')
-                round_val = json_object.get('round')
-                original_document = json_object.get('original_document')
-
-                model_extractions = json_object.get('model_summaries', {})
-
-                claude_summ = model_extractions.get('claude-5w1h', {}).get('summ')
-                commandr_summ = model_extractions.get('commandr-5w1h', {}).get('summ')
-                gpt4o_summ = model_extractions.get('gpt4o-5w1h', {}).get('summ')
-                reka_summ = model_extractions.get('reka-5w1h', {}).get('summ')
-                llama3_summ = model_extractions.get('llama3-5w1h', {}).get('summ')
-
-                data_list.append({
-                    'idx': idx,
-                    'round': round_val,
-                    'original_document': original_document,
-                    'claude-5w1h_summ': claude_summ,
-                    'commandr-5w1h_summ': commandr_summ,
-                    'gpt4o-5w1h_summ': gpt4o_summ,
-                    'reka-5w1h_summ': reka_summ,
-                    'llama3-5w1h_summ': llama3_summ
-                })
-            except json.JSONDecodeError:
-                print(f"Warning (Line {line_number}): Skipped line (extractions) due to JSON decoding error: {line.strip()}")
-            except Exception as e:
-                print(f"Warning (Line {line_number}): Skipped line (extractions) due to an unexpected error ({e}): {line.strip()}")
-
-    return data_list
+    return list(iter_jsonl_records([str(abs_path)], partial(_parse_basse_line, key_name=key_name), _describe_basse_error))
 
 
 # Process the JSONL file of extractions and generate a list of dictionaries.
-def process_basse_extractions(jsonl_file_path_extractions):
+def process_basse_extractions(jsonl_file_path_extractions, key_name='model_summaries'):
     # Process the JSONL file of extractions
-    list_of_extractions_objects = get_list_of_objects_from_basse_dataset(jsonl_file_path_extractions)
+    list_of_extractions_objects = get_list_of_objects_from_basse_dataset(jsonl_file_path_extractions, key_name=key_name)
 
     # Now 'list_of_summary_objects' is a list of dictionaries.
     # if list_of_summary_objects:
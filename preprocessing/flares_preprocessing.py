@@ -1,79 +1,131 @@
-import json
-from collections import defaultdict
+import logging
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+
+from core.utils import dumps_indented
+from preprocessing.jsonl_reader import iter_jsonl_records
+
+logger = logging.getLogger(__name__)
+
+# Labels are interned when read, so comparisons against these constants hit the identity fast path
+LABEL_TITLE = {sys.intern(label): label.title() for label in ('WHO', 'WHAT', 'WHEN', 'WHERE', 'WHY', 'HOW')}
+REQUIRED_LABELS = frozenset(sys.intern(label) for label in ('WHO', 'WHAT', 'WHEN', 'WHERE'))  # 'WHY' and 'HOW' do not appear in most of the FLARES data
+RELIABLE = sys.intern('confiable')
 
 
 # ---------------------------------------------------------------------------
 # FUNCTION 1: Load, process, and merge datasets from files
 # ---------------------------------------------------------------------------
 
-def _process_flares_single_object(json_object):
+class ProcessedTag:
+    """A FLARES tag with its per-label enumeration ('WHO_1', 'WHO_2', ...)."""
+    __slots__ = ('label', 'enum_id', 'reliability', 'text', 'start')
+    label: Any
+    enum_id: Optional[str]
+    reliability: Any
+    text: Any
+    start: Any
+
+    def __init__(self, label: Any, enum_id: Optional[str], reliability: Any, text: Any, start: Any) -> None:
+        self.label = label
+        self.enum_id = enum_id
+        self.reliability = reliability
+        self.text = text
+        self.start = start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            '5W1H_Label': self.label,
+            'Enumerated_Tag_Id': self.enum_id,
+            'Reliability_Label': self.reliability,
+            'Tag_Text': self.text,
+            'Tag_Start': self.start,
+        }
+
+
+class ProcessedObject:
+    """A FLARES entry (Id, Text) with its processed tags."""
+    __slots__ = ('id', 'text', 'tags')
+    id: Any
+    text: Any
+    tags: List[ProcessedTag]
+
+    def __init__(self, id: Any, text: Any, tags: List[ProcessedTag]) -> None:
+        self.id = id
+        self.text = text
+        self.tags = tags
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'Id': self.id, 'Text': self.text, 'Processed_Tags': [tag.to_dict() for tag in self.tags]}
+
+
+def _process_flares_single_object(json_object: Dict[str, Any]) -> ProcessedObject:
     """
     (Internal Helper) Processes a single JSON object, enumerating its tags.
     """
-    processed_object = {
-        'Id': json_object.get('Id'),
-        'Text': json_object.get('Text'),
-        'Processed_Tags': []
-    }
-    tags = json_object.get('Tags', [])
-    w5h1_label_counts = defaultdict(int)
-
-    if tags:
-        for tag_item in tags:
-            original_w5h1_label = tag_item.get('5W1H_Label')
-            processed_tag = {
-                '5W1H_Label': original_w5h1_label,
-                'Enumerated_Tag_Id': None,
-                'Reliability_Label': tag_item.get('Reliability_Label'),
-                'Tag_Text': tag_item.get('Tag_Text'),
-                'Tag_Start': tag_item.get('Tag_Start')
-            }
-            if original_w5h1_label:
-                w5h1_label_counts[original_w5h1_label] += 1
-                current_count = w5h1_label_counts[original_w5h1_label]
-                processed_tag['Enumerated_Tag_Id'] = f"{original_w5h1_label}_{current_count}"
-            processed_object['Processed_Tags'].append(processed_tag)
-    return processed_object
-
-
-def _get_objects_from_jsonl(filepath):
+    processed_tags: List[ProcessedTag] = []
+    append = processed_tags.append
+    # Plain dict: most objects have only a few labels, and .get avoids defaultdict's per-object setup
+    w5h1_label_counts: Dict[str, int] = {}
+    count_of = w5h1_label_counts.get
+    intern = sys.intern
+
+    for tag_item in json_object.get('Tags') or []:
+        # One method lookup per tag; the four fields are read in a single statement
+        get = tag_item.get
+        label, reliability, text, start = get('5W1H_Label'), get('Reliability_Label'), get('Tag_Text'), get('Tag_Start')
+        if isinstance(label, str):
+            label = intern(label)
+        if isinstance(reliability, str):
+            reliability = intern(reliability)
+        enum_id = None
+        if label:
+            count = count_of(label, 0) + 1
+            w5h1_label_counts[label] = count
+            enum_id = f"{label}_{count}"
+        append(ProcessedTag(label, enum_id, reliability, text, start))
+    return ProcessedObject(json_object.get('Id'), json_object.get('Text'), processed_tags)
+
+
+def _describe_flares_error(error, line):
+    if isinstance(error, orjson.JSONDecodeError):
+        return "Skipped line due to JSON decoding error."
+    return f"Skipped line due to unexpected error ({error})."
+
+
+def iter_merged_objects(file_paths):
     """
-    (Internal Helper) Processes a JSONL file and returns a list of processed objects.
+    Yields the processed objects of all files, in file and line order, without building the
+    merged list. Large inputs are split into line-aligned byte ranges processed by worker
+    processes (see `preprocessing.jsonl_reader.iter_jsonl_records`).
+
+    Args:
+        file_paths (list): A list of strings with the paths to the files.
     """
-    all_processed_objects = []
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line_number, line in enumerate(f, 1):
-            try:
-                json_object = json.loads(line.strip())
-                processed_data = _process_flares_single_object(json_object)
-                all_processed_objects.append(processed_data)
-            except json.JSONDecodeError:
-                print(
-                    f"Warning (Line {line_number}): Skipped line due to JSON decoding error.")
-            except Exception as e:
-                print(f"Warning (Line {line_number}): Skipped line due to unexpected error ({e}).")
-    return all_processed_objects
-
-
-def load_and_merge_datasets(file_paths):
+    return iter_jsonl_records(file_paths, _process_flares_single_object, _describe_flares_error)
+
+
+def load_and_merge_datasets(file_paths, verbose=True):
     """
     Loads data from a list of JSONL file paths, processes them, and
-    merges them into a single dataset.
+    merges them into a single dataset (see `iter_merged_objects` for the parallel reading).
 
     Args:
         file_paths (list): A list of strings with the paths to the files.
+        verbose (bool): Print a summary. The first merged object is logged at DEBUG level.
 
     Returns:
-        list: A list of dictionaries (merged_dataset) with the combined data.
+        list: A list of ProcessedObject (merged_dataset) with the combined data.
     """
-    merged_dataset = []
-    for path in file_paths:
-        merged_dataset.extend(_get_objects_from_jsonl(path))
+    merged_dataset = list(iter_merged_objects(file_paths))
 
+    if not verbose:
+        return merged_dataset
     print(f"Processed and merged {len(merged_dataset)} objects from {len(file_paths)} file(s).")
-    if merged_dataset:
-        print("Example of the first object in 'merged_dataset':")
-        print(json.dumps(merged_dataset[0], indent=2, ensure_ascii=False))
+    if merged_dataset and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Example of the first object in 'merged_dataset':\n%s", dumps_indented(merged_dataset[0].to_dict()))
 
     return merged_dataset
 
@@ -82,78 +134,90 @@ def load_and_merge_datasets(file_paths):
 # FUNCTION 2: Filter, select, and flatten the combined dataset
 # ---------------------------------------------------------------------------
 
-def _select_best_combination(list_of_objects):
+def _select_best_combination(list_of_objects: Iterable[ProcessedObject]) -> Iterator[ProcessedObject]:
     """
     (Internal Helper) Filters for each object the first 'reliable' tag of
-    each required 5W1H type.
+    each required 5W1H type. Accepts any iterable and yields the selected objects.
     """
-    best_combinations_list = []
-    REQUIRED_LABELS = {'WHO', 'WHAT', 'WHEN', 'WHERE'} # 'WHY' and 'HOW' do not appear in most of the FLARES data
-
     for obj in list_of_objects:
-        grouped_tags = defaultdict(list)
-        for tag in obj.get('Processed_Tags', []):
-            label = tag.get('5W1H_Label')
-            if label:
-                grouped_tags[label].append(tag)
-
-        if not REQUIRED_LABELS.issubset(grouped_tags.keys()):
-            continue
-
-        best_tags_for_this_object = []
-        is_complete_with_reliable = True
-        for label in REQUIRED_LABELS:
-            reliable_tags = [t for t in grouped_tags[label] if t.get('Reliability_Label') == 'confiable']
-            if not reliable_tags:
-                is_complete_with_reliable = False
-                break
-            reliable_tags.sort(key=lambda x: x['Tag_Start'])
-            best_tags_for_this_object.append(reliable_tags[0])
-
-        if is_complete_with_reliable:
-            best_tags_for_this_object.sort(key=lambda x: x['Tag_Start'])
-            new_object = {'Id': obj['Id'], 'Text': obj['Text'], 'Processed_Tags': best_tags_for_this_object}
-            best_combinations_list.append(new_object)
-
-    return best_combinations_list
-
-
-def _flatten_objects(optimal_list):
+        # Single pass: keep the earliest reliable tag of each required label
+        best: Dict[str, ProcessedTag] = {}
+        for tag in obj.tags:
+            label = tag.label
+            if label not in REQUIRED_LABELS or tag.reliability != RELIABLE:
+                continue
+            current = best.get(label)
+            if current is None or tag.start < current.start:
+                best[label] = tag
+
+        if len(best) == len(REQUIRED_LABELS):
+            best_tags_for_this_object = sorted(best.values(), key=lambda x: x.start)
+            yield ProcessedObject(obj.id, obj.text, best_tags_for_this_object)
+
+
+def _flatten_object(obj: ProcessedObject) -> Dict[str, Any]:
     """
-    (Internal Helper) Transforms a list of nested objects into a flat format.
+    (Internal Helper) Transforms a nested object into a flat format.
     """
-    flattened_list = []
-    for obj in optimal_list:
-        new_flattened_obj = {'Id': obj.get('Id'), 'Text': obj.get('Text')}
-        for tag in obj.get('Processed_Tags', []):
-            label = tag.get('5W1H_Label')
-            if label:
-                new_flattened_obj[label.title()] = tag.get('Tag_Text')
-        flattened_list.append(new_flattened_obj)
-    return flattened_list
-
-
-def process_and_flatten_data(merged_dataset):
+    new_flattened_obj: Dict[str, Any] = {'Id': obj.id, 'Text': obj.text}
+    title = LABEL_TITLE.get
+    for tag in obj.tags:
+        label = tag.label
+        if label:
+            new_flattened_obj[title(label) or label.title()] = tag.text
+    return new_flattened_obj
+
+
+def process_and_flatten_data(merged_dataset, verbose=True):
     """
     Takes the combined dataset, filters it to get the best 5W1H tag combination,
-    and transforms it into a flat format.
+    and transforms it into a flat format. Objects flow through one at a time, so
+    `merged_dataset` may be a generator (e.g. `iter_merged_objects`) and only the
+    flat rows are kept in memory.
 
     Args:
-        merged_dataset (list): The list generated by load_and_merge_datasets.
+        merged_dataset (iterable): The objects from load_and_merge_datasets or iter_merged_objects.
+        verbose (bool): Print progress. The first flattened object is logged at DEBUG level.
 
     Returns:
         list: A list of dictionaries in flat format (final_flat_list).
     """
-    # 1. Filter and select the best tag combination
-    optimal_list = _select_best_combination(merged_dataset)
-    print(f"\nAfter applying the 'best combination' filter, {len(optimal_list)} objects remained.")
+    n_input = 0
 
-    # 2. Flatten the resulting objects
-    final_flat_list = _flatten_objects(optimal_list)
-    print(f"Transformed {len(final_flat_list)} objects to flat format.")
+    def _counted(objects):
+        nonlocal n_input
+        for obj in objects:
+            n_input += 1
+            yield obj
 
-    if final_flat_list:
-        print("\nExample of the first object in 'final_flat_list':")
-        print(json.dumps(final_flat_list[0], indent=2, ensure_ascii=False))
+    # 1. Filter and select the best tag combination, 2. flatten the resulting objects
+    final_flat_list = [_flatten_object(obj) for obj in _select_best_combination(_counted(merged_dataset))]
+    if verbose:
+        print(f"\nAfter applying the 'best combination' filter, {len(final_flat_list)} of {n_input} objects remained.")
+        print(f"Transformed {len(final_flat_list)} objects to flat format.")
 
-    return final_flat_list
\ No newline at end of file
+    # Pretty-printing an example is only worth its cost when someone is debugging
+    if final_flat_list and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Example of the first object in 'final_flat_list':\n%s", dumps_indented(final_flat_list[0]))
+
+    return final_flat_list
+
+
+# ---------------------------------------------------------------------------
+# ENTRY POINT: Load and flatten the FLARES files in one call
+# ---------------------------------------------------------------------------
+
+def load_flares_dataset(file_paths, verbose=True):
+    """
+    Loads the FLARES JSONL files and returns the flattened list of documents.
+    Nothing runs at import time; the FLARES plugin calls this from `preprocess(cfg)`.
+
+    Args:
+        file_paths (list): Paths to the FLARES files (e.g. train and trial).
+        verbose (bool): Print progress. Example objects are logged at DEBUG level.
+
+    Returns:
+        list: A list of dictionaries in flat format.
+    """
+    # Streamed: the merged (unflattened) dataset is never held in memory as a whole
+    return process_and_flatten_data(iter_merged_objects(file_paths), verbose=verbose)
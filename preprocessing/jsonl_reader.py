@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import orjson
+
+# Below this total input size files are read in-process: starting worker processes would cost more than it saves
+PARALLEL_MIN_BYTES = 5 * 1024 * 1024
+
+
+def _iter_parsed_lines(lines, parse_line, describe_error, on_warning):
+    """
+    (Internal Helper) Decodes JSONL lines one at a time and yields `parse_line(json_object)` for each.
+    Bad lines are reported through `on_warning(line_number, describe_error(exception, line))` and skipped.
+    """
+    for line_number, line in enumerate(lines, 1):
+        try:
+            record = parse_line(orjson.loads(line))
+        except Exception as e:
+            on_warning(line_number, describe_error(e, line))
+            continue
+        yield record
+
+
+def _parse_range(args):
+    """
+    (Internal Helper) Parses the lines in the byte range [start, end) of a JSONL file.
+    Runs in a worker process, so warnings are returned (with line numbers relative to
+    the range) instead of printed.
+
+    Returns:
+        tuple: (list of records, list of (relative line number, warning), number of lines)
+    """
+    path, start, end, parse_line, describe_error = args
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = data.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()  # the range ends with a newline
+
+    warnings = []
+    records = list(_iter_parsed_lines(lines, parse_line, describe_error, lambda n, msg: warnings.append((n, msg))))
+    return records, warnings, len(lines)
+
+
+def _line_aligned_ranges(path, size, n_chunks):
+    """(Internal Helper) Splits [0, size) into up to `n_chunks` byte ranges that start at line boundaries."""
+    offsets = [0]
+    with open(path, 'rb') as f:
+        for k in range(1, n_chunks):
+            f.seek(size * k // n_chunks)
+            f.readline()  # move to the start of the next line
+            pos = f.tell()
+            if offsets[-1] < pos < size:
+                offsets.append(pos)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def iter_jsonl_records(file_paths, parse_line, describe_error):
+    """
+    Yields `parse_line(json_object)` for every line of the given JSONL files, in file and line order.
+    When the files total 5 MB or more, each file of that size is split into line-aligned byte
+    ranges processed by worker processes, and records are yielded range by range as results
+    arrive. Bad lines are skipped with a warning built by `describe_error(exception, line)`.
+
+    `parse_line` and `describe_error` must be module-level functions (or partials of them) so they
+    can be sent to the worker processes.
+
+    Args:
+        file_paths (list): Paths to the JSONL files.
+        parse_line (callable): Turns one decoded JSON object into a record.
+        describe_error (callable): Returns the warning text for a line that failed to decode or parse.
+    """
+    workers = os.cpu_count() or 1
+    sizes = [os.path.getsize(p) for p in file_paths]
+    if workers < 2 or sum(sizes) < PARALLEL_MIN_BYTES:
+        for path in file_paths:
+            with open(path, 'rb') as f:
+                yield from _iter_parsed_lines(
+                    f, parse_line, describe_error,
+                    lambda n, msg, path=path: print(f"Warning ({path}, Line {n}): {msg}"),
+                )
+        return
+
+    # Ranges from every file go to one pool; files below the threshold stay in one piece
+    jobs = []
+    for path, size in zip(file_paths, sizes):
+        n_chunks = workers if size >= PARALLEL_MIN_BYTES else 1
+        jobs.extend((path, start, end, parse_line, describe_error) for start, end in _line_aligned_ranges(path, size, n_chunks))
+    first_line = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        for job, (records, warnings, n_lines) in zip(jobs, pool.map(_parse_range, jobs)):
+            path = job[0]
+            offset = first_line.get(path, 0)
+            for line_number, message in warnings:
+                print(f"Warning ({path}, Line {offset + line_number}): {message}")
+            first_line[path] = offset + n_lines
+            yield from records
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class Scores(BaseModel):
@@ -104,4 +104,8 @@ class DetailedEvaluation(BaseModel):
     """
     scores: Scores = Field(..., description="The set of all numerical scores for the evaluation.")
     justifications: Justifications = Field(..., description="The set of all textual justifications supporting the scores.")
-    confidence_level: ConfidenceLevel = Field(..., description="The confidence level for the source text.")
\ No newline at end of file
+    confidence_level: ConfidenceLevel = Field(..., description="The confidence level for the source text.")
+
+
+# Built once and shared by the runners for schema generation and repeated validation
+DETAILED_EVALUATION_ADAPTER = TypeAdapter(DetailedEvaluation)
@@ -0,0 +1,63 @@
+from typing import Annotated, Any, Dict, Union
+
+import msgspec
+
+from pydantic_models.output_pydantic_models import DETAILED_EVALUATION_ADAPTER
+
+Score = Annotated[int, msgspec.Meta(ge=1, le=5)]
+
+
+class ScoresStruct(msgspec.Struct):
+    """msgspec mirror of `Scores` (same fields, same 1–5 bounds)."""
+    factual_accuracy: Score
+    completeness: Score
+    relevance_and_conciseness: Score
+    clarity_and_readability: Score
+    source_faithfulness: Score
+    overall_coherence: Score
+
+
+class JustificationsStruct(msgspec.Struct):
+    """msgspec mirror of `Justifications`."""
+    factual_accuracy: str
+    completeness: str
+    relevance_and_conciseness: str
+    clarity_and_readability: str
+    source_faithfulness: str
+    overall_coherence: str
+
+
+class ConfidenceLevelStruct(msgspec.Struct):
+    """msgspec mirror of `ConfidenceLevel`."""
+    score: Score
+    justification: str
+
+
+class DetailedEvaluationStruct(msgspec.Struct):
+    """msgspec mirror of `DetailedEvaluation`, used only to decode LLM output."""
+    scores: ScoresStruct
+    justifications: JustificationsStruct
+    confidence_level: ConfidenceLevelStruct
+
+
+_DECODER = msgspec.json.Decoder(DetailedEvaluationStruct)
+
+
+def decode_evaluation(raw: Union[str, bytes]) -> Dict[str, Any]:
+    """
+    Decode and validate a `DetailedEvaluation` JSON document into plain dicts
+    (same shape as `DetailedEvaluation.model_dump()`).
+
+    Decoded with msgspec; anything it rejects is handed to Pydantic, which keeps the
+    lax coercions (e.g. "4" -> 4) and produces the usual validation error messages.
+    """
+    try:
+        return msgspec.to_builtins(_DECODER.decode(raw))
+    except (msgspec.ValidationError, msgspec.DecodeError):
+        pass
+    return DETAILED_EVALUATION_ADAPTER.dump_python(DETAILED_EVALUATION_ADAPTER.validate_json(raw))
+
+
+def validate_evaluation(obj: Any) -> Dict[str, Any]:
+    """Validate an already-parsed object (e.g. from a JSON content fallback) as `DetailedEvaluation`."""
+    return DETAILED_EVALUATION_ADAPTER.dump_python(DETAILED_EVALUATION_ADAPTER.validate_python(obj))
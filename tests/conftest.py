@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Modules are imported the same way main.py does, relative to the repository root
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
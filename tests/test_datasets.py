@@ -0,0 +1,15 @@
+from core.datasets import _cached_preprocess
+
+
+def test_snapshot_write_failure_still_returns_docs(tmp_path):
+    source = tmp_path / "input.jsonl"
+    source.write_text("{}\n")
+    # A file where the cache directory should be makes every snapshot write fail
+    blocked = tmp_path / "cache"
+    blocked.write_text("")
+    cfg = {"paths": {"preprocess_cache_dir": str(blocked)}}
+
+    docs = _cached_preprocess(cfg, "BASSE", [str(source)], lambda: [{"doc": 1}])
+
+    assert docs == [{"doc": 1}]
+    assert not list(tmp_path.rglob("*.tmp"))
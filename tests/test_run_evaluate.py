@@ -0,0 +1,199 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import main
+from core.utils import checkpoint_filename, read_jsonl, write_jsonl
+from evaluator.anthropic_runner import AnthropicEvaluator
+from evaluator.gemini_runner import GeminiEvaluator
+from evaluator import openai_batch_runner
+from evaluator.openai_batch_runner import OpenAIBatchEvaluator
+from evaluator.openai_runner import OpenAIEvaluator
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_EVALUATION = {
+    "scores": {
+        "factual_accuracy": 5,
+        "completeness": 4,
+        "relevance_and_conciseness": 4,
+        "clarity_and_readability": 5,
+        "source_faithfulness": 5,
+        "overall_coherence": 4,
+    },
+    "justifications": {
+        "factual_accuracy": "ok",
+        "completeness": "ok",
+        "relevance_and_conciseness": "ok",
+        "clarity_and_readability": "ok",
+        "source_faithfulness": "ok",
+        "overall_coherence": "ok",
+    },
+    "confidence_level": {"score": 4, "justification": "ok"},
+}
+
+
+class FakeCompletions:
+    """
+    Stands in for `AsyncOpenAI.chat.completions`: every request returns the same tool call,
+    except call number `fail_on`, which times out.
+    """
+    def __init__(self, fail_on=None):
+        self.calls = 0
+        self.fail_on = fail_on
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.test/v1/chat/completions"))
+        tool_call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(_EVALUATION)))
+        message = SimpleNamespace(tool_calls=[tool_call], content=None)
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class FakeClient:
+    def __init__(self, fail_on=None):
+        self.chat = SimpleNamespace(completions=FakeCompletions(fail_on))
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    for env_var in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GEMINI_API_KEY"):
+        monkeypatch.setenv(env_var, "test-key")
+    for cls in (OpenAIEvaluator, AnthropicEvaluator, GeminiEvaluator):
+        monkeypatch.setattr(cls, "_build_client", lambda self: FakeClient())
+    monkeypatch.chdir(ROOT)
+
+
+def _cfg(tmp_path, provider, **run):
+    return {
+        "run": {"environment": "test", "verbose": False, "concurrency": 2, **run},
+        "paths": {"results_dir": str(tmp_path), "basse_jsonl": "data/basse/BASSE.jsonl"},
+        "llm": {"provider": provider, "model": "test-model"},
+        "validation": {"generate_review_task": False},
+    }
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic", "gemini"])
+def test_run_evaluate_with_fake_client(fake_clients, tmp_path, provider):
+    final = main.run_evaluate("BASSE", _cfg(tmp_path, provider), limit=3)
+
+    assert len(final["results"]) == 3
+    assert all(r["evaluation_data"]["scores"]["factual_accuracy"] == 5 for r in final["results"])
+    # The checkpoint is removed once the final JSON is written
+    assert not list(tmp_path.glob("*.partial.jsonl"))
+    assert len(list(tmp_path.glob(f"*_test_BASSE_{provider}_test-model.json"))) == 1
+
+
+def test_sync_evaluate_with_fake_client(fake_clients, tmp_path):
+    evaluator = OpenAIEvaluator(_cfg(tmp_path, "openai"))
+    tasks = [("doc", "text", "extraction", "model")]
+
+    results = evaluator.evaluate(tasks)
+
+    assert results[0]["evaluation_data"] is not None
+    assert results[0]["token_usage"]["total_tokens"] == 15
+
+
+def test_batch_runner_falls_back_to_regular_requests(fake_clients, tmp_path):
+    evaluator = OpenAIBatchEvaluator(_cfg(tmp_path, "openai", mode="batch", batch_min_size=10))
+    seen = []
+
+    results = main.asyncio.run(main._evaluate_all(evaluator, [("doc", "text", "extraction", "model")], 1, on_result=seen.append))
+
+    assert results[0]["evaluation_data"] is not None
+    assert seen == results
+
+
+class FakeBatchClient:
+    """Stands in for the `files` and `batches` parts of `AsyncOpenAI`; every batch completes at once."""
+    def __init__(self):
+        self.inputs = {}
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch)
+
+    async def _create_file(self, file, purpose):
+        file_id = f"file-{len(self.inputs)}"
+        self.inputs[file_id] = file[1].decode("utf-8").splitlines()
+        return SimpleNamespace(id=file_id)
+
+    async def _create_batch(self, input_file_id, endpoint, completion_window):
+        return SimpleNamespace(id=f"batch-{input_file_id}", status="completed", output_file_id=input_file_id, error_file_id=None)
+
+    async def _file_content(self, file_id):
+        message = {"tool_calls": [{"function": {"arguments": json.dumps(_EVALUATION)}}]}
+        body = {"choices": [{"message": message}], "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}
+        lines = [
+            json.dumps({"custom_id": json.loads(line)["custom_id"], "response": {"status_code": 200, "body": body}})
+            for line in self.inputs[file_id]
+        ]
+        return SimpleNamespace(text="\n".join(lines))
+
+
+def test_batch_runner_splits_runs_above_the_batch_limits(fake_clients, monkeypatch, tmp_path):
+    client = FakeBatchClient()
+    monkeypatch.setattr(OpenAIEvaluator, "_build_client", lambda self: client)
+    monkeypatch.setattr(openai_batch_runner, "_MAX_BATCH_REQUESTS", 2)
+    evaluator = OpenAIBatchEvaluator(_cfg(tmp_path, "openai", mode="batch"))
+    tasks = [(f"d{k}", "text", "extraction", "model") for k in range(5)]
+
+    results = main.asyncio.run(evaluator.evaluate_async(tasks))
+
+    assert [len(lines) for lines in client.inputs.values()] == [2, 2, 1]
+    assert [r["document_idx"] for r in results] == [f"d{k}" for k in range(5)]
+    assert all(r["evaluation_data"] is not None for r in results)
+
+
+def test_failed_request_does_not_abort_the_run(fake_clients, monkeypatch, tmp_path):
+    client = FakeClient(fail_on=4)
+    monkeypatch.setattr(OpenAIEvaluator, "_build_client", lambda self: client)
+    cfg = _cfg(tmp_path, "openai", concurrency=3)
+
+    final = main.run_evaluate("BASSE", cfg, limit=6)
+
+    errors = [r for r in final["results"] if r["evaluation_data"] is None]
+    assert len(final["results"]) == 6
+    assert len(errors) == 1 and errors[0]["error"].startswith("API error")
+    # Successes are checkpointed and the checkpoint is kept, so a re-run retries only the failure
+    assert len(list(tmp_path.glob("*.partial.jsonl"))) == 1
+
+    client.chat.completions = FakeCompletions()
+    final = main.run_evaluate("BASSE", cfg, limit=6)
+
+    assert client.chat.completions.calls == 1
+    assert all(r["evaluation_data"] is not None for r in final["results"])
+    assert not list(tmp_path.glob("*.partial.jsonl"))
+
+
+def test_resume_reuses_checkpointed_result_for_duplicate_content(fake_clients, monkeypatch, tmp_path):
+    tasks = [
+        ("d0", "same text", "same extraction", "claude"),
+        ("d1", "same text", "same extraction", "claude"),
+        ("d2", "other text", "other extraction", "claude"),
+    ]
+    monkeypatch.setattr(main, "iter_tasks", lambda dataset, cfg, limit=None: iter(tasks))
+    client = FakeClient(fail_on=1)
+    monkeypatch.setattr(OpenAIEvaluator, "_build_client", lambda self: client)
+    cfg = _cfg(tmp_path, "openai", concurrency=1)
+    checkpoint = checkpoint_filename("test", "BASSE", "openai", "test-model", tmp_path)
+    write_jsonl(checkpoint, [{
+        "document_idx": "d0", "model_evaluated": "claude", "evaluation_data": _EVALUATION,
+        "token_usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }])
+
+    final = main.run_evaluate("BASSE", cfg)
+
+    # Only d2 is sent (and fails); d1 reuses d0's checkpointed evaluation
+    assert client.chat.completions.calls == 1
+    d1 = final["results"][1]
+    assert d1["evaluation_data"] == _EVALUATION
+    assert d1["duplicate_of"] == {"document_idx": "d0", "model_evaluated": "claude"}
+    assert {(r["document_idx"], r["model_evaluated"]) for r in read_jsonl(checkpoint)} == {("d0", "claude"), ("d1", "claude")}
@@ -0,0 +1,46 @@
+import sys
+from types import SimpleNamespace
+
+from evaluator.token_budget import TokenBudget
+
+
+def _offline_tiktoken():
+    def fail(*args, **kwargs):
+        raise ConnectionError("cannot download the BPE file")
+    return SimpleNamespace(encoding_for_model=fail, get_encoding=fail)
+
+
+def test_check_is_skipped_when_encoding_cannot_be_loaded(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tiktoken", _offline_tiktoken())
+
+    budget = TokenBudget("gpt-4o", 100, "system prompt")
+
+    assert budget.exceeded("x" * 1_000_000) is None
+
+
+def test_check_is_skipped_for_unknown_models():
+    budget = TokenBudget("some-unknown-model", 100, "system prompt")
+
+    assert budget.exceeded("x" * 1_000_000) is None
+
+
+def _byte_level_tiktoken():
+    # One token per byte, plus a special token; built locally so no BPE file is downloaded
+    import tiktoken
+
+    enc = tiktoken.Encoding(
+        name="bytes",
+        pat_str=r".",
+        mergeable_ranks={bytes([b]): b for b in range(256)},
+        special_tokens={"<|endoftext|>": 256},
+    )
+    return SimpleNamespace(encoding_for_model=lambda model: enc, get_encoding=lambda name: enc)
+
+
+def test_special_token_text_is_counted_as_plain_text(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tiktoken", _byte_level_tiktoken())
+
+    budget = TokenBudget("gpt-4o", 100, "<|endoftext|>", context_window=200)
+
+    assert budget.exceeded("<|endoftext|>" * 6) is None
+    assert budget.exceeded("<|endoftext|>" * 7).startswith("Prompt too long: ~104 input tokens")
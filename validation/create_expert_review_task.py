@@ -1,4 +1,15 @@
-import json
+from core.utils import dumps_indented
+from pydantic_models.output_pydantic_models import Scores
+
+# Criteria are the fields of `Scores`, in declaration order; computed once at import
+_CRITERIA = tuple(Scores.model_fields)
+# Blank expert feedback block; copied per criterion so reviewers' edits stay independent
+_EMPTY_FEEDBACK = {
+    "score_validity_1_to_5": " ",
+    "explanation_quality": " ",
+    "optional_notes": " ",
+}
+
 
 def create_expert_review_task(
     doc_id: str,
@@ -10,27 +21,25 @@ def create_expert_review_task(
     """
     Builds the expert review task structure from evaluation results.
     """
-    scores_dict = evaluation_object.scores.model_dump()
-    justifications_dict = evaluation_object.justifications.model_dump()
-    confidence_level_dict = evaluation_object.confidence_level.model_dump()
+    # The object was validated by the caller: read the field values Pydantic already stores on
+    # each sub-model instead of copying them out with model_dump() (read-only, never mutated)
+    scores_dict = evaluation_object.scores.__dict__
+    justifications_dict = evaluation_object.justifications.__dict__
+    confidence_level_dict = evaluation_object.confidence_level.__dict__
 
     # 1. Build the nested judgments object for expert review
     judgments_to_review = {
         criterion: {
             "ai_score": scores_dict[criterion],
             "ai_justification": justifications_dict[criterion],
-            "expert_feedback": {
-                "score_validity_1_to_5": " ",
-                "explanation_quality": " ",
-                "optional_notes": " "
-            },
+            "expert_feedback": _EMPTY_FEEDBACK.copy(),
         }
-        for criterion in scores_dict.keys()
+        for criterion in _CRITERIA
     }
 
     # 2. Build the unique review object containing everything
     extraction_str = (
-        json.dumps(extraction_to_evaluate, indent=2, ensure_ascii=False)
+        dumps_indented(extraction_to_evaluate)
         if isinstance(extraction_to_evaluate, dict)
         else extraction_to_evaluate
     )
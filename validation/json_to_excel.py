@@ -1,6 +1,12 @@
-import pandas as pd
-import json
 import argparse
+from pathlib import Path
+
+import orjson
+import xlsxwriter
+
+
+def _load_json(json_path: str):
+    return orjson.loads(Path(json_path).read_bytes())
 
 
 def create_excel_for_review(json_path: str, excel_path: str):
@@ -14,12 +20,11 @@ def create_excel_for_review(json_path: str, excel_path: str):
     """
     print(f"Loading data from '{json_path}'...")
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = _load_json(json_path)
     except FileNotFoundError:
         print(f"Error: File not found at path: {json_path}")
         return
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         print(f"Error: The file '{json_path}' is not a valid JSON.")
         return
 
@@ -33,42 +38,7 @@ def create_excel_for_review(json_path: str, excel_path: str):
         print("Error: Unrecognized JSON structure. Expected a list or a dict with 'review_items'.")
         return
 
-    # Flatten the JSON structure to convert it into a table
-    rows_for_excel = []
-    for task in tasks:
-        # Common information repeated across the 6 rows for each task
-        common_info = {
-            'doc_id': task['document_info']['doc_id'],
-            'model_evaluated': task['extraction_info']['model_evaluated'],
-            'full_source_text': task['document_info']['full_source_text'],
-            'extraction_to_evaluate': task['extraction_info']['extraction_to_evaluate'],
-            'confidence_level': task['confidence_level']['score'],
-            'confidence_level_justification': task['confidence_level']['justification'],
-        }
-
-        # Create one row per criterion to be evaluated
-        for criterion, details in task['judgments_to_review'].items():
-            row = {
-                'review_id': f"{task['review_id']}_{criterion}",
-                'criterion': criterion,
-                'ai_score': details['ai_score'],
-                'ai_justification': details['ai_justification'],
-                **common_info,
-                # Empty fields for the expert to fill in
-                'expert_score_validity (1-5)': '',
-                'expert_explanation_quality': '',
-                'expert_optional_notes': '',
-            }
-            rows_for_excel.append(row)
-
-    if not rows_for_excel:
-        print("No data found to process in the JSON file.")
-        return
-
-    # Create a pandas DataFrame
-    df = pd.DataFrame(rows_for_excel)
-
-    # Reorder columns for a more logical structure
+    # Column order for a more logical structure in the sheet
     column_order = [
         'review_id', 'doc_id', 'model_evaluated',
         'confidence_level', 'confidence_level_justification',
@@ -76,16 +46,46 @@ def create_excel_for_review(json_path: str, excel_path: str):
         'expert_score_validity (1-5)', 'expert_explanation_quality', 'expert_optional_notes',
         'full_source_text', 'extraction_to_evaluate'
     ]
-    df = df[column_order]
+
+    # Values shared by all rows of a task are stored once per task; each criterion row keeps
+    # only its own values plus the position of its task
+    task_common = []
+    criterion_rows = []
+    for task in tasks:
+        task_pos = len(task_common)
+        task_common.append((
+            task['document_info']['doc_id'],
+            task['extraction_info']['model_evaluated'],
+            task['confidence_level']['score'],
+            task['confidence_level']['justification'],
+            task['document_info']['full_source_text'],
+            task['extraction_info']['extraction_to_evaluate'],
+        ))
+
+        # Create one row per criterion to be evaluated
+        for criterion, details in task['judgments_to_review'].items():
+            criterion_rows.append((
+                task_pos,
+                f"{task['review_id']}_{criterion}",
+                criterion,
+                details['ai_score'],
+                details['ai_justification'],
+            ))
+
+    if not criterion_rows:
+        print("No data found to process in the JSON file.")
+        return
+
+    n_rows = len(criterion_rows)
 
     print(f"Creating Excel file...")
 
     # Use XlsxWriter to add advanced formatting to the Excel file. Make sure to install it via pip if not already installed.
-    with pd.ExcelWriter(excel_path, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Review Tasks', index=False)
-
-        workbook = writer.book
-        worksheet = writer.sheets['Review Tasks']
+    # constant_memory flushes rows to disk as they are written, so memory stays flat for large files.
+    # It requires strictly row-by-row writes (pandas' to_excel goes column by column), hence write_row.
+    # strings_to_urls is off so URL doc_ids stay plain text instead of becoming hyperlinks.
+    with xlsxwriter.Workbook(excel_path, {'constant_memory': True, 'strings_to_urls': False}) as workbook:
+        worksheet = workbook.add_worksheet('Review Tasks')
 
         # 1. Adjust column widths
         worksheet.set_column('A:A', 40)  # review_id
@@ -103,12 +103,15 @@ def create_excel_for_review(json_path: str, excel_path: str):
 
         # 2. Create a drop-down menu for 'expert_explanation_quality'
         quality_options = ['Precisa y Útil', 'Plausible pero Imprecisa', 'Incorrecta o No Útil']
-        worksheet.data_validation('J2:J{}'.format(len(df) + 1), {
+        worksheet.data_validation('J2:J{}'.format(n_rows + 1), {
             'validate': 'list',
             'source': quality_options
         })
 
-        # 3. Header formatting
+        # 3. Freeze the top row (headers)
+        worksheet.freeze_panes(1, 0)
+
+        # 4. Header row (formatted), then the data rows in order
         header_format = workbook.add_format({
             'bold': True,
             'text_wrap': True,
@@ -116,11 +119,17 @@ def create_excel_for_review(json_path: str, excel_path: str):
             'fg_color': '#D7E4BC',
             'border': 1
         })
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-
-        # 4. Freeze the top row (headers)
-        worksheet.freeze_panes(1, 0)
+        worksheet.write_row(0, 0, column_order, header_format)
+        for row_num, (task_pos, review_id, criterion, ai_score, ai_justification) in enumerate(criterion_rows, start=1):
+            doc_id, model_evaluated, confidence_level, confidence_justification, full_source_text, extraction = task_common[task_pos]
+            # Same order as column_order; the three expert columns are left empty for the expert to fill in
+            worksheet.write_row(row_num, 0, (
+                review_id, doc_id, model_evaluated,
+                confidence_level, confidence_justification,
+                criterion, ai_score, ai_justification,
+                '', '', '',
+                full_source_text, extraction,
+            ))
 
     print("Process completed successfully!")
 